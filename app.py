@@ -1,10 +1,26 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time
+
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
-import numpy as np
-import random
+
+from charts import (create_heatmap, create_location_detail_heatmap, create_location_summary,
+                    create_overlap_chart, detail_page_count)
+from profiling import StageProfiler
+from reservations import (BACKGROUND_WORKERS, DATASET_REGISTRY_BYTES, DEFAULT_BUFFER_MINUTES,
+                          DEFAULT_CAPACITY, DEFAULT_HOTSPOT_THRESHOLD, DEFAULT_SLOT_MINUTES,
+                          DEFAULT_TOP_SLOTS, FILE_FORMATS, LOCATION_SET_CONDITIONS, MINUTES_PER_DAY,
+                          PARALLEL_EXECUTORS, RESERVATION_SORT_KEYS, AvailabilityIndex,
+                          BackgroundJob, DatasetRegistry, LiveReservationStore, OccupancyBitsets,
+                          OccupancyIndex, OccupancySnapshot, ParallelConfig, ReservationDatabase,
+                          ReservationSet, TimeGrid, busiest_slots, bytes_content_hash,
+                          calculate_peak_overlaps, calculate_time_slots, date_to_day,
+                          detect_conflicts, file_format_from_name, format_minutes,
+                          generate_sample_data, load_or_compute_snapshot, minutes_to_date,
+                          minutes_to_time, parse_pasted_reservations, read_reservations,
+                          reservation_page_frame, search_reservations, sort_reservations)
 
 # Page configuration
 st.set_page_config(
@@ -94,387 +110,209 @@ h1, h2, h3 {
 </style>
 """, unsafe_allow_html=True)
 
-# Updated sample data with location, id, time structure
-def generate_sample_data():
-    locations = ["Sample 1", "Sample 2", "Sample 3", "Sample 4", "Sample 5"]
-    sample_times = [
-        "18:00", "15:00", "07:00", "12:00", "12:00", "17:00", "10:00", "10:00", 
-        "14:00", "12:00", "10:30", "15:00", "18:30", "12:00", "14:00", "08:00",
-        "07:00", "15:00", "16:30", "10:00", "06:30", "14:31", "09:50", "21:30",
-        "21:00", "22:00", "20:30", "19:00", "16:00", "11:00", "13:30", "09:00",
-        "20:00", "22:30", "11:30", "13:00", "16:45", "08:30", "19:30", "17:45"
-    ]
-    
-    data = []
-    for i in range(40):  # Generate 40 sample records
-        data.append({
-            'location': random.choice(locations),
-            'id': int(4.2e8 + random.randint(0, int(2e9))),  # Similar to your ID range
-            'time': sample_times[i % len(sample_times)]
-        })
-    
-    return data
+# Generated once per server process so reruns see the same sample (and hit the cache)
+@st.cache_data(show_spinner=False)
+def load_sample_records():
+    return generate_sample_data()
 
-DEFAULT_DATA = generate_sample_data()
+DEFAULT_DATA = ReservationSet.from_records(load_sample_records())
 
-def time_to_minutes(time_str):
-    """Convert time string to minutes"""
-    try:
-        hours, minutes = map(int, time_str.split(':'))
-        return hours * 60 + minutes
-    except:
-        return 0
-
-def minutes_to_time(minutes):
-    """Convert minutes to time string"""
-    hours = minutes // 60
-    mins = minutes % 60
-    return f"{hours:02d}:{mins:02d}"
-
-def sort_reservations_by_time(data):
-    """Sort reservations by time"""
-    return sorted(data, key=lambda x: time_to_minutes(x['time']))
-
-def calculate_time_slots(data, start_hour=8, end_hour=18, selected_location=None):
-    """Calculate reservation status by time slots"""
-    # Filter by location if selected
-    if selected_location and selected_location != "All Locations":
-        data = [item for item in data if item['location'] == selected_location]
-    
-    # Create 10-minute interval time slots
-    time_slots = []
-    for hour in range(start_hour, end_hour):
-        for minute in range(0, 60, 10):
-            slot_minutes = hour * 60 + minute
-            time_slots.append({
-                'time': minutes_to_time(slot_minutes),
-                'minutes': slot_minutes,
-                'count': 0,
-                'reservations': []
-            })
-    
-    # Filter reservations that have any overlap with the time range
-    start_minutes = start_hour * 60
-    end_minutes = end_hour * 60
-    
-    filtered_data = []
-    for item in data:
-        reservation_minutes = time_to_minutes(item['time'])
-        reservation_start = reservation_minutes - 30  # 30분 전부터
-        reservation_end = reservation_minutes + 30    # 30분 후까지
-        
-        # 예약 시간대가 설정된 시간 범위와 겹치는지 확인
-        if reservation_end > start_minutes and reservation_start < end_minutes:
-            filtered_data.append(item)
-    
-    # Calculate slot occupancy for filtered reservations
-    for item in filtered_data:
-        original_minutes = time_to_minutes(item['time'])
-        start_minutes_res = original_minutes - 30
-        end_minutes_res = original_minutes + 30
-        
-        for slot in time_slots:
-            slot_minutes = slot['minutes']
-            if start_minutes_res <= slot_minutes < end_minutes_res:
-                slot['count'] += 1
-                slot['reservations'].append({
-                    'id': item['id'],
-                    'location': item['location'],
-                    'time': item['time']
-                })
-    
-    return time_slots, filtered_data
-
-def calculate_max_overlap_per_location(data, start_hour=8, end_hour=18):
-    """Calculate maximum overlap for each location separately"""
-    # Group data by location
-    location_groups = {}
-    for item in data:
-        location = item['location']
-        if location not in location_groups:
-            location_groups[location] = []
-        location_groups[location].append(item)
-    
-    max_overlaps = {}
-    
-    # Calculate max overlap for each location
-    for location, location_data in location_groups.items():
-        # Create time slots for this location only
-        time_slots, _ = calculate_time_slots(location_data, start_hour, end_hour)
-        
-        # Find maximum overlap for this location
-        max_overlap = max([slot['count'] for slot in time_slots]) if time_slots else 0
-        max_overlaps[location] = max_overlap
-    
-    # Return the overall maximum across all locations
-    return max(max_overlaps.values()) if max_overlaps else 0
+SLOT_WIDTH_OPTIONS = [1, 5, 10, 15, 30, 60]
 
-def create_heatmap(time_slots, data, selected_location=None):
-    """Create heatmap chart grouped by location with expandable details"""
-    # Prepare time-based data
-    times = [slot['time'] for slot in time_slots]
-    
-    # Group data by location
-    location_groups = {}
-    for item in data:
-        location = item['location']
-        if location not in location_groups:
-            location_groups[location] = []
-        location_groups[location].append(item)
-    
-    # Sort locations by number of reservations (descending)
-    sorted_locations = sorted(location_groups.keys(), 
-                            key=lambda loc: len(location_groups[loc]), 
-                            reverse=True)
-    
-    # Create summary heatmap (only totals)
-    z_data_summary = []
-    y_labels_summary = []
-    
-    # Process each location - only totals
-    for location in sorted_locations:
-        location_items = location_groups[location]
-        
-        # Calculate location total row
-        location_total_row = [0] * len(time_slots)
-        for item in location_items:
-            original_minutes = time_to_minutes(item['time'])
-            start_minutes = original_minutes - 30
-            end_minutes = original_minutes + 30
-            
-            for i, slot in enumerate(time_slots):
-                slot_minutes = slot['minutes']
-                if start_minutes <= slot_minutes < end_minutes:
-                    location_total_row[i] += 1
-        
-        # Add location total row
-        z_data_summary.append(location_total_row)
-        y_labels_summary.append(f"🏢 {location} ({len(location_items)} reservations)")
-    
-    # Create summary heatmap (reverse y-axis order to show highest count first)
-    fig_summary = go.Figure(data=go.Heatmap(
-        z=z_data_summary,
-        x=times,
-        y=y_labels_summary,
-        colorscale=[
-            [0, 'white'],
-            [0.5, '#ff6b6b'],
-            [1, '#e74c3c']
-        ],
-        showscale=True,
-        colorbar=dict(
-            title="Reservations",
-            tickmode="linear",
-            tick0=0,
-            dtick=1
-        ),
-        text=[[str(val) if val > 0 else '' for val in row] for row in z_data_summary],
-        texttemplate="%{text}",
-        textfont={"size": 12, "color": "white"},
-        hoverongaps=False,
-        hovertemplate="<b>%{y}</b><br>Time: %{x}<br>Reservations: %{z}<extra></extra>"
-    ))
-    
-    # Add vertical dotted lines at 30-minute intervals
-    for i in range(0, len(times), 3):  # Every 3rd time slot (30 minutes)
-        x_pos = i
-        
-        # Add vertical line using shape
-        fig_summary.add_shape(
-            type="line",
-            x0=x_pos,
-            x1=x_pos,
-            y0=-0.5,
-            y1=len(y_labels_summary) - 0.5,
-            line=dict(color="rgba(128,128,128,0.3)", width=0.5, dash="dash"),
-            xref="x",
-            yref="y"
-        )
-    
-    title = f"Time Reservation Summary by Location (±30 minutes applied)"
-    if selected_location and selected_location != "All Locations":
-        title += f" - {selected_location}"
-    
-    fig_summary.update_layout(
-        title=title,
-        xaxis_title="Time",
-        yaxis_title="Locations",
-        height=max(400, len(sorted_locations) * 50 + 100),
-        xaxis=dict(
-            tickangle=45,
-            tickmode='linear',
-            dtick=3  # Display at 30-minute intervals
-        ),
-        yaxis=dict(
-            tickfont=dict(size=11),
-            autorange='reversed'  # Reverse y-axis to show highest count at top
-        ),
-        margin=dict(l=250, r=50, t=50, b=100),
-        showlegend=False
-    )
-    
-    # Return sorted location groups to maintain order
-    sorted_location_groups = {loc: location_groups[loc] for loc in sorted_locations}
-    
-    return fig_summary, sorted_location_groups
+# Conflict rows shown in the table; the download holds all of them
+CONFLICT_TABLE_ROWS = 500
 
-def create_location_detail_heatmap(location, location_items, time_slots):
-    """Create detailed heatmap for a specific location"""
-    # Prepare time-based data
-    times = [slot['time'] for slot in time_slots]
-    
-    # Sort items by time within location (earliest first)
-    location_items_sorted = sort_reservations_by_time(location_items)
-    
-    # Create detailed heatmap data - TOTAL FIRST, then reversed individual items
-    z_data_detail = []
-    y_labels_detail = []
-    
-    # Calculate location total row (same as summary)
-    location_total_row = [0] * len(time_slots)
-    for item in location_items:
-        original_minutes = time_to_minutes(item['time'])
-        start_minutes = original_minutes - 30
-        end_minutes = original_minutes + 30
-        
-        for i, slot in enumerate(time_slots):
-            slot_minutes = slot['minutes']
-            if start_minutes <= slot_minutes < end_minutes:
-                location_total_row[i] += 1
-    
-    # Add individual reservation rows first (reversed so latest shows first)
-    for item in reversed(location_items_sorted):
-        row = []
-        original_minutes = time_to_minutes(item['time'])
-        start_minutes = original_minutes - 30
-        end_minutes = original_minutes + 30
-        
-        for slot in time_slots:
-            slot_minutes = slot['minutes']
-            if start_minutes <= slot_minutes < end_minutes:
-                row.append(1)  # Reserved
-            else:
-                row.append(0)  # Available
-        
-        z_data_detail.append(row)
-        y_labels_detail.append(f"ID {item['id']} ({item['time']})")
-    
-    # Add TOTAL row at the END (so it appears at TOP of chart)
-    z_data_detail.append(location_total_row)
-    y_labels_detail.append(f"📊 TOTAL ({len(location_items)} reservations)")
-    
-    # Create detailed heatmap
-    fig_detail = go.Figure(data=go.Heatmap(
-        z=z_data_detail,
-        x=times,
-        y=y_labels_detail,
-        colorscale=[
-            [0, 'white'],
-            [0.5, '#ff6b6b'],
-            [1, '#e74c3c']
-        ],
-        showscale=False,  # Remove color bar (legend)
-        text=[[''] * len(row) for row in z_data_detail[:-1]] + [  # No text for individual rows
-            [str(val) if val > 0 else '' for val in z_data_detail[-1]]  # Numbers for TOTAL row
-        ],
-        texttemplate="%{text}",
-        textfont={"size": 12, "color": "white"},
-        hoverongaps=False,
-        hovertemplate="<b>%{y}</b><br>Time: %{x}<br>Value: %{z}<extra></extra>"
-    ))
-    
-    # Add vertical dotted lines at 30-minute intervals
-    for i in range(0, len(times), 3):  # Every 3rd time slot (30 minutes)
-        x_pos = i
-        
-        # Add vertical line using shape
-        fig_detail.add_shape(
-            type="line",
-            x0=x_pos,
-            x1=x_pos,
-            y0=-0.5,
-            y1=len(y_labels_detail) - 0.5,
-            line=dict(color="rgba(128,128,128,0.3)", width=0.5, dash="dash"),
-            xref="x",
-            yref="y"
-        )
-    
-    fig_detail.update_layout(
-        title=f"Detailed View: {location}",
-        xaxis_title="Time",
-        yaxis_title="Reservation Details",
-        height=max(300, (len(location_items_sorted) + 1) * 25 + 100),  # +1 for total row
-        xaxis=dict(
-            tickangle=45,
-            tickmode='linear',
-            dtick=3  # 30-minute intervals
-        ),
-        yaxis=dict(
-            tickfont=dict(size=10)
-        ),
-        margin=dict(l=200, r=50, t=50, b=80),
-        showlegend=False
-    )
-    
-    return fig_detail
-
-def create_overlap_chart(time_slots):
-    """Overlap reservation distribution chart"""
-    overlap_counts = {}
-    for slot in time_slots:
-        count = slot['count']
-        if count > 0:
-            overlap_counts[count] = overlap_counts.get(count, 0) + 1
-    
-    if overlap_counts:
-        counts = list(overlap_counts.keys())
-        frequencies = list(overlap_counts.values())
-        
-        fig = px.bar(
-            x=counts,
-            y=frequencies,
-            labels={'x': 'Concurrent Reservations', 'y': 'Time Slot Count'},
-            title='Concurrent Reservation Distribution',
-            color=counts,
-            color_continuous_scale='Reds'
-        )
-        
-        fig.update_traces(
-            text=frequencies,
-            textposition='outside'
-        )
-        
-        fig.update_layout(height=400)
-        return fig
-    
-    return None
-
-def create_location_summary(data):
-    """Create location-wise summary"""
-    location_counts = {}
-    for item in data:
-        location = item['location']
-        location_counts[location] = location_counts.get(location, 0) + 1
-    
-    if location_counts:
-        locations = list(location_counts.keys())
-        counts = list(location_counts.values())
-        
-        fig = px.pie(
-            values=counts,
-            names=locations,
-            title='Reservations by Location'
-        )
-        
-        fig.update_layout(height=400)
-        return fig
-    
-    return None
+# Rejected rows listed in the sidebar after a load
+REJECTED_ROWS_SHOWN = 100
+
+def show_rejected_rows(rejected):
+    """Sidebar warning and table for rows whose time or date did not parse"""
+    if not len(rejected):
+        return
+    st.sidebar.warning(f"{rejected.summary()}.")
+    with st.sidebar.expander("Rejected Rows"):
+        st.dataframe(rejected.frame(REJECTED_ROWS_SHOWN), hide_index=True, use_container_width=True)
+        if len(rejected) > REJECTED_ROWS_SHOWN:
+            st.caption(f"Showing the first {REJECTED_ROWS_SHOWN} of {len(rejected)} rejected rows.")
+
+# Reservation list paging
+RESERVATION_PAGE_ROWS = 50
+CARD_VIEW_MAX_ROWS = 200
+
+# Long computations run on a shared pool: parsing large uploads, and the views below the
+# metrics and summary heatmap of large datasets. Reruns poll until they are ready.
+BACKGROUND_MIN_BYTES = 8 << 20
+BACKGROUND_MIN_ROWS = 200_000
+BACKGROUND_POLL_SECONDS = 0.5
+
+@st.cache_resource
+def background_executor():
+    return ThreadPoolExecutor(BACKGROUND_WORKERS)
+
+def background_job(slot, key, stages):
+    """This session's job in slot for key, cancelling and replacing one started for another key"""
+    jobs = st.session_state.setdefault('background_jobs', {})
+    job = jobs.get(slot)
+    if job is None or job.key != key:
+        if job is not None:
+            job.cancel()
+        job = jobs[slot] = BackgroundJob(key, stages).start(background_executor())
+    return job
+
+def cancel_background_job(slot):
+    """Cancel this session's job in slot, if any"""
+    job = st.session_state.get('background_jobs', {}).pop(slot, None)
+    if job is not None:
+        job.cancel()
+
+def show_pending(job):
+    """Progress of the background work a section is waiting for"""
+    st.progress(job.progress, text=f"Computing {job.current or 'queued work'}...")
+
+# Parsed datasets and their occupancy, shared by every session of the server process
+DATASET_CACHE_BYTES = int(os.environ.get('RESERVATIONS_CACHE_BYTES', DATASET_REGISTRY_BYTES))
+
+@st.cache_resource
+def dataset_registry():
+    return DatasetRegistry(DATASET_CACHE_BYTES)
+
+def load_uploaded_reservations(uploaded_file):
+    """Content hash and shared ReservationSet of an upload; each upload is hashed once
+    
+    Files of BACKGROUND_MIN_BYTES or more are parsed in the background, and
+    the set is None until that has finished.
+    """
+    file_id, key = st.session_state.get('upload_hash', (None, None))
+    if file_id != uploaded_file.file_id:
+        key = bytes_content_hash(uploaded_file.getvalue())
+        st.session_state['upload_hash'] = (uploaded_file.file_id, key)
+    file_format = file_format_from_name(uploaded_file.name)
+    load = lambda: dataset_registry().dataset(
+        key, lambda: read_reservations(io.BytesIO(uploaded_file.getvalue()), file_format))
+    if uploaded_file.size >= BACKGROUND_MIN_BYTES:
+        job = background_job('parse', key, [('parse', load)])
+        if not job.ready('parse'):
+            return key, None
+        if job.error('parse') is not None:
+            raise job.error('parse')
+    with st.spinner("Loading reservations..."):
+        return key, load()
+
+# Local SQLite database that uploads can be saved to and reopened from. The
+# path is set by whoever runs the server; browser sessions cannot choose another.
+DATABASE_PATH = os.environ.get('RESERVATIONS_DB', 'reservations.db')
+
+# Indexed database reads, keyed on the file's modification time so saves invalidate them
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_database_summary(path, modified):
+    database = ReservationDatabase(path, create=False)
+    return database.dated, database.day_range(), database.location_counts()
+
+@st.cache_data(max_entries=16, show_spinner="Querying database...",
+               hash_funcs={TimeGrid: lambda grid: grid.key})
+def load_database_view(path, modified, grid, location, margin=0):
+    return ReservationDatabase(path, create=False).load_view(grid, location, margin)
+
+# Occupancy snapshot saved next to the database; a resource, so its memory maps are not copied
+@st.cache_resource(max_entries=4, show_spinner="Loading occupancy snapshot...",
+                   hash_funcs={TimeGrid: lambda grid: grid.key})
+def load_database_snapshot(path, modified, grid, _parallel=None):
+    return load_or_compute_snapshot(path, grid, lambda: load_database_view(path, modified, grid, None),
+                                    _parallel)
+
+# Cached views, keyed on the dataset content hash plus the time grid and location filter.
+# UI-only reruns (expanders, tabs) reuse these instead of rebuilding slots and figures.
+CACHE_MAX_ENTRIES = 64
+cache_view = st.cache_data(
+    max_entries=CACHE_MAX_ENTRIES,
+    show_spinner=False,
+    hash_funcs={ReservationSet: lambda data: data.content_hash, TimeGrid: lambda grid: grid.key}
+)
+
+@cache_view
+def cached_time_slots(data, grid, selected_location):
+    return calculate_time_slots(data, grid, selected_location)
+
+# Underscore arguments are not part of the cache key: parallel results equal the
+# serial ones, and heatmap builders update the session's previous figure
+@cache_view
+def cached_peak_overlaps(data, grid, selected_location, _parallel=None):
+    _, reservation_data = cached_time_slots(data, grid, selected_location)
+    return calculate_peak_overlaps(reservation_data, grid, _parallel)
+
+@cache_view
+def cached_busiest_slots(data, grid, selected_location, k, threshold, _parallel=None):
+    _, reservation_data = cached_time_slots(data, grid, selected_location)
+    return busiest_slots(reservation_data, grid, k, threshold, _parallel)
+
+@cache_view
+def cached_occupancy_index(data, grid, selected_location):
+    _, reservation_data = cached_time_slots(data, grid, selected_location)
+    return OccupancyIndex(reservation_data, grid)
+
+@cache_view
+def cached_heatmap(data, grid, selected_location, _figure=None, _parallel=None, _snapshot=None):
+    time_slots, reservation_data = cached_time_slots(data, grid, selected_location)
+    return create_heatmap(time_slots, reservation_data, grid, selected_location, _figure, _parallel,
+                          _snapshot)
+
+@cache_view
+def cached_location_detail_heatmap(data, grid, selected_location, location,
+                                   page=0, group_identical=True, _figure=None):
+    time_slots, reservation_data = cached_time_slots(data, grid, selected_location)
+    return create_location_detail_heatmap(location, reservation_data.filter_location(location),
+                                          time_slots, grid, page, group_identical, figure=_figure)
+
+@cache_view
+def cached_availability_index(data, grid):
+    return AvailabilityIndex(data, grid)
+
+@cache_view
+def cached_occupancy_bitsets(data, grid):
+    return OccupancyBitsets(data, grid)
+
+@cache_view
+def cached_overlap_chart(data, grid, selected_location):
+    time_slots, _ = cached_time_slots(data, grid, selected_location)
+    return create_overlap_chart(time_slots)
+
+@cache_view
+def cached_location_summary(data, grid, selected_location):
+    _, reservation_data = cached_time_slots(data, grid, selected_location)
+    return create_location_summary(reservation_data)
+
+@cache_view
+def cached_conflict_frame(data, grid, selected_location, capacity, location_capacities):
+    _, reservation_data = cached_time_slots(data, grid, selected_location)
+    return detect_conflicts(reservation_data, grid, capacity, location_capacities).frame()
+
+@cache_view
+def cached_conflict_csv(data, grid, selected_location, capacity, location_capacities):
+    return cached_conflict_frame(data, grid, selected_location, capacity,
+                                 location_capacities).to_csv(index=False)
+
+@cache_view
+def cached_reservation_order(data, grid, selected_location, query, sort_by, descending):
+    _, reservation_data = cached_time_slots(data, grid, selected_location)
+    order = sort_reservations(reservation_data, sort_by, descending)
+    return order[search_reservations(reservation_data, query)[order]]
 
 # Main application
 def main():
+    # Opt-in stage profiling; the toggles are drawn at the end of the sidebar
+    profile_reruns = st.session_state.get('profile_reruns', False)
+    if profile_reruns:
+        st.session_state['profile_run'] = st.session_state.get('profile_run', 0) + 1
+    profiler = StageProfiler(profile_reruns, st.session_state.get('profile_allocations', False),
+                             st.session_state.get('profile_run'))
+    # finish() must run even when st.rerun() or an error ends the script early
+    try:
+        show_dashboard(profiler)
+    finally:
+        profiler.finish()
+
+def show_dashboard(profiler):
     st.title("📅 Time Reservation Management System")
-    st.markdown("**Visualizes reservation status with ±30 minute buffer time applied**")
     
     # Sidebar configuration
     st.sidebar.header("⚙️ Settings")
@@ -490,61 +328,232 @@ def main():
         st.sidebar.error("End hour must be later than start hour.")
         return
     
+    # Time grid configuration
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        slot_minutes = st.selectbox("Slot Width (min)", SLOT_WIDTH_OPTIONS,
+                                    index=SLOT_WIDTH_OPTIONS.index(DEFAULT_SLOT_MINUTES))
+    with col2:
+        buffer_minutes = st.number_input("Buffer (±min)", min_value=1, max_value=720,
+                                         value=DEFAULT_BUFFER_MINUTES, step=5)
+    capacity = st.sidebar.number_input("Capacity per Location", min_value=0, value=DEFAULT_CAPACITY,
+                                       help="Concurrent reservations allowed before a conflict")
+    
     # Data input method selection
     data_input_method = st.sidebar.radio(
         "Data Input Method",
-        ["Use Sample Data", "Upload CSV File", "Manual Input"]
+        ["Use Sample Data", "Upload CSV File", "SQLite Database", "Manual Input"]
     )
     
-    data = DEFAULT_DATA.copy()
+    data = DEFAULT_DATA
+    store = None
+    database_summary = None
+    dataset_key = None
     
     if data_input_method == "Upload CSV File":
-        uploaded_file = st.sidebar.file_uploader("Select CSV file", type="csv")
+        uploaded_file = st.sidebar.file_uploader("Select CSV, Parquet or Arrow file",
+                                                 type=list(FILE_FORMATS))
         if uploaded_file is not None:
             try:
-                df = pd.read_csv(uploaded_file)
-                required_columns = ['location', 'id', 'time']
-                if all(col in df.columns for col in required_columns):
-                    data = df.to_dict('records')
-                    st.sidebar.success(f"Loaded {len(data)} reservation records.")
-                else:
-                    st.sidebar.error(f"CSV file must contain columns: {', '.join(required_columns)}")
+                with profiler.stage("load upload") as stage:
+                    dataset_key, data = load_uploaded_reservations(uploaded_file)
+                    stage.rows = len(data) if data is not None else None
+                if data is None:
+                    parse_job = st.session_state['background_jobs']['parse']
+                    st.info(f"Parsing {uploaded_file.name} ({uploaded_file.size / 2**20:.0f} MiB)...")
+                    show_pending(parse_job)
+                    parse_job.wait(BACKGROUND_POLL_SECONDS)
+                    st.rerun()
+                st.sidebar.success(f"Loaded {len(data)} reservation records.")
+                show_rejected_rows(data.rejected)
+                
+                # Saved uploads reopen from the database without parsing the file again
+                if st.sidebar.button("Save to Database",
+                                     help="Replace the reservations in the server's database"):
+                    with profiler.stage("save database", rows=len(data)):
+                        ReservationDatabase(DATABASE_PATH).add(data, replace=True)
+                    st.sidebar.success(f"Saved {len(data)} reservations to the database.")
+            except ValueError as e:
+                st.sidebar.error(str(e))
             except Exception as e:
                 st.sidebar.error(f"File reading error: {e}")
     
+    elif data_input_method == "SQLite Database":
+        database_path = DATABASE_PATH
+        try:
+            database_modified = os.path.getmtime(database_path)
+            with profiler.stage("database summary"):
+                database_summary = load_database_summary(database_path, database_modified)
+            st.sidebar.success(f"{sum(database_summary[2].values())} reservations in the database.")
+        except FileNotFoundError:
+            st.sidebar.warning("No database file yet. Upload a file and save it to the database.")
+        except Exception as e:
+            st.sidebar.error(f"Database error: {e}")
+    
     elif data_input_method == "Manual Input":
+        # Session-persistent store, seeded with the sample data on first use
+        store = LiveReservationStore(st.session_state.setdefault('live_reservations', {}))
+        if not store.initialized:
+            store.add_set(DEFAULT_DATA)
+        
         st.sidebar.subheader("Add Reservation")
         with st.sidebar.form("add_reservation"):
             new_location = st.text_input("Location", value="Sample 1")
             new_id = st.number_input("Reservation ID", min_value=1, value=int(4.2e8))
             new_time = st.time_input("Reservation Time")
+            new_minute = new_time.hour * 60 + new_time.minute
+            if store.state['dated']:
+                new_minute += date_to_day(st.date_input("Reservation Date")) * MINUTES_PER_DAY
             
             if st.form_submit_button("Add Reservation"):
-                data.append({
-                    'location': new_location,
-                    'id': int(new_id),
-                    'time': new_time.strftime("%H:%M")
-                })
-                st.sidebar.success("Reservation added.")
-                st.experimental_rerun()
+                if store.add(new_location, int(new_id), new_minute):
+                    st.sidebar.success("Reservation added.")
+                else:
+                    st.sidebar.error(f"Reservation ID {int(new_id)} already exists.")
+        
+        with st.sidebar.form("paste_reservations", clear_on_submit=True):
+            pasted = st.text_area("Bulk Paste", placeholder="location,id,time[,date] per line")
+            if st.form_submit_button("Add Pasted") and pasted.strip():
+                try:
+                    pasted_data = parse_pasted_reservations(pasted)
+                    added = store.add_set(pasted_data)
+                    st.sidebar.success(f"Added {added} of {len(pasted_data)} pasted reservations.")
+                    show_rejected_rows(pasted_data.rejected)
+                except ValueError as e:
+                    st.sidebar.error(str(e))
+                except Exception as e:
+                    st.sidebar.error(f"Paste reading error: {e}")
+        
+        with st.sidebar.form("remove_reservations", clear_on_submit=True):
+            remove_ids = st.text_input("Remove IDs", placeholder="Comma-separated reservation IDs")
+            if st.form_submit_button("Remove") and remove_ids.strip():
+                try:
+                    ids = [int(value) for value in remove_ids.replace(' ', '').split(',') if value]
+                    removed = sum(store.remove(reservation_id) for reservation_id in ids)
+                    st.sidebar.success(f"Removed {removed} of {len(ids)} reservations.")
+                except ValueError:
+                    st.sidebar.error("Reservation IDs must be whole numbers.")
+        
+        with profiler.stage("manual store", rows=len(store)):
+            data = store.reservation_set()
+    
+    # Date range for dated data; computations only touch the selected days
+    day_range = None
+    if database_summary is not None:
+        if database_summary[0]:
+            day_range = database_summary[1]
+    elif data.dated and len(data):
+        days = data.days()
+        day_range = int(days[0]), int(days[-1])
+    start_day = end_day = 0
+    if day_range is not None:
+        first_date = minutes_to_date(day_range[0] * MINUTES_PER_DAY)
+        last_date = minutes_to_date(day_range[1] * MINUTES_PER_DAY)
+        date_range = st.sidebar.date_input("Date Range", value=(last_date, last_date),
+                                           min_value=first_date, max_value=last_date)
+        if not isinstance(date_range, (tuple, list)):
+            date_range = (date_range,)
+        if date_range:
+            start_day = date_to_day(date_range[0])
+            end_day = date_to_day(date_range[-1])
     
     # Location filter
-    locations = sorted(list(set([item['location'] for item in data])))
-    selected_location = st.sidebar.selectbox(
-        "Filter by Location",
-        ["All Locations"] + locations
-    )
+    if database_summary is not None:
+        locations = sorted(database_summary[2])
+    else:
+        locations = sorted(data.present_locations())
+    filter_mode = st.sidebar.radio("Location Filter Mode", ["Single Location", "Location Set"],
+                                   horizontal=True)
+    location_set = []
+    if filter_mode == "Single Location":
+        selected_location = st.sidebar.selectbox(
+            "Filter by Location",
+            ["All Locations"] + locations
+        )
+    else:
+        # Minutes matching a condition across several locations, from packed bitsets
+        selected_location = "All Locations"
+        location_set = st.sidebar.multiselect("Locations", locations, default=locations[:2])
+        set_condition = st.sidebar.selectbox("Show Minutes When", LOCATION_SET_CONDITIONS,
+                                             format_func=str.capitalize)
+    
+    # Per-location buffer and capacity overrides; blank cells use the defaults
+    with st.sidebar.expander("Per-location Overrides"):
+        buffer_table = st.data_editor(
+            pd.DataFrame({
+                'Location': locations,
+                'Buffer (±min)': pd.Series([None] * len(locations), dtype='Int64'),
+                'Capacity': pd.Series([None] * len(locations), dtype='Int64')
+            }),
+            column_config={
+                'Location': st.column_config.TextColumn(disabled=True),
+                'Buffer (±min)': st.column_config.NumberColumn(min_value=1, max_value=720, step=1),
+                'Capacity': st.column_config.NumberColumn(min_value=0, step=1)
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    location_buffers = {
+        location: int(buffer)
+        for location, buffer in zip(buffer_table['Location'], buffer_table['Buffer (±min)'])
+        if not pd.isna(buffer)
+    }
+    location_capacities = {
+        location: int(value)
+        for location, value in zip(buffer_table['Location'], buffer_table['Capacity'])
+        if not pd.isna(value)
+    }
+    grid = TimeGrid(start_hour, end_hour, slot_minutes, int(buffer_minutes), location_buffers,
+                    start_day, end_day)
+    
+    # Location-partitioned computation for datasets with many locations
+    with st.sidebar.expander("Parallel Computation"):
+        workers = st.number_input("Workers", min_value=1, max_value=os.cpu_count() or 1, value=1,
+                                  help="Split per-location occupancy and peaks across a pool")
+        executor = st.radio("Executor", PARALLEL_EXECUTORS, horizontal=True, disabled=workers == 1)
+    parallel = ParallelConfig(int(workers), executor)
+    
+    st.markdown(f"**Visualizes reservation status with {grid.buffer_label()} buffer time applied**")
+    metric_location = None if selected_location == "All Locations" else selected_location
+    if database_summary is not None:
+        # Only the rows of the selected days and location are read, via the indexes
+        with profiler.stage("database query") as stage:
+            data = load_database_view(database_path, database_modified, grid, metric_location)
+            stage.rows = len(data)
+    if store is not None:
+        with profiler.stage("manual store sync", rows=len(store)):
+            store.sync(grid)
+    
+    # Whole-dataset views read occupancy and peaks from the snapshot next to the database
+    # file, or from the one shared by every session that uploaded the same file
+    snapshot = None
+    if database_summary is not None and metric_location is None:
+        with profiler.stage("occupancy snapshot"):
+            snapshot = load_database_snapshot(database_path, database_modified, grid, parallel)
+    elif dataset_key is not None and metric_location is None:
+        with profiler.stage("occupancy snapshot"):
+            snapshot = dataset_registry().get(
+                dataset_key, ('occupancy', grid.key),
+                lambda: OccupancySnapshot.compute(data, grid, parallel))
     
     # Data processing
-    time_slots, reservation_data = calculate_time_slots(data, start_hour, end_hour, selected_location)
-    
-    # Show filtering info
-    total_filtered = len(reservation_data)
-    total_original = len([item for item in data if selected_location == "All Locations" or item['location'] == selected_location])
+    view = (data, grid, selected_location)
+    with profiler.stage("time slots", rows=len(data)):
+        time_slots, reservation_data = cached_time_slots(*view)
+    
+    # Show filtering info; manual input keeps its totals up to date incrementally and
+    # databases count them with an indexed query
+    total_filtered = store.total(metric_location) if store is not None else len(reservation_data)
+    if database_summary is not None:
+        location_counts = database_summary[2]
+        total_original = (location_counts.get(metric_location, 0) if metric_location
+                          else sum(location_counts.values()))
+    else:
+        total_original = len(data if selected_location == "All Locations" else data.filter_location(selected_location))
     
     if total_filtered < total_original:
         filtered_out = total_original - total_filtered
-        st.info(f"ℹ️ {filtered_out} reservations are hidden (outside time range considering ±30min buffer)")
+        st.info(f"ℹ️ {filtered_out} reservations are hidden (outside time range considering {grid.buffer_label()} buffer)")
     
     # Display metrics
     col1, col2, col3 = st.columns(3)
@@ -553,22 +562,44 @@ def main():
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #4a90e2; margin: 0;">Total Reservations</h3>
-            <h2 style="margin: 0;">{len(reservation_data)}</h2>
+            <h2 style="margin: 0;">{total_filtered}</h2>
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
         # Calculate max overlap per location separately
-        max_overlap = calculate_max_overlap_per_location(reservation_data, start_hour, end_hour)
+        if store is not None:
+            max_overlap = store.peak(metric_location)
+            peak_location = metric_location or store.peak_location()
+            peak_interval = store.peak_interval(peak_location) if max_overlap > 0 else None
+        else:
+            with profiler.stage("max overlap", rows=len(reservation_data)):
+                if snapshot is not None:
+                    peaks = snapshot.peaks()
+                else:
+                    peaks = cached_peak_overlaps(*view, _parallel=parallel)
+            max_overlap = max((peak['count'] for peak in peaks.values()), default=0)
+            peak_interval = None
+            if max_overlap > 0:
+                peak_location, peak = max(peaks.items(), key=lambda entry: entry[1]['count'])
+                peak_interval = peak['start'], peak['end']
+        peak_note = ""
+        if peak_interval:
+            peak_note = (f"<small>{peak_location} · {grid.slot_label(peak_interval[0])} ~ "
+                         f"{minutes_to_time(peak_interval[1])}</small>")
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #f39c12; margin: 0;">Max Overlap</h3>
             <h2 style="margin: 0;">{max_overlap}</h2>
+            {peak_note}
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        unique_locations = len(set([item['location'] for item in reservation_data]))
+        if store is not None:
+            unique_locations = store.active_locations(metric_location)
+        else:
+            unique_locations = len(reservation_data.present_locations())
         st.markdown(f"""
         <div class="metric-card">
             <h3 style="color: #27ae60; margin: 0;">Active Locations</h3>
@@ -576,12 +607,51 @@ def main():
         </div>
         """, unsafe_allow_html=True)
     
+    # Large views build the sections below the summary heatmap in the background; a changed
+    # hour range, filter or setting cancels the work still queued for the previous view
+    view_job = None
+    conflict_view = (*view, int(capacity), location_capacities)
+    busiest_view = (*view, int(st.session_state.get('top_slots', DEFAULT_TOP_SLOTS)),
+                    int(st.session_state.get('hotspot_threshold', DEFAULT_HOTSPOT_THRESHOLD)))
+    if len(reservation_data) >= BACKGROUND_MIN_ROWS:
+        view_key = (data.content_hash, grid.key, selected_location, int(capacity),
+                    tuple(sorted(location_capacities.items())), *busiest_view[3:])
+        view_job = background_job('view', view_key, [
+            ('overlap chart', lambda: cached_overlap_chart(*view)),
+            ('busiest slots', lambda: cached_busiest_slots(*busiest_view, _parallel=parallel)),
+            ('occupancy index', lambda: cached_occupancy_index(*view)),
+            ('capacity conflicts', lambda: cached_conflict_csv(*conflict_view)),
+            ('location summary', lambda: cached_location_summary(*view)),
+            ('reservation list', lambda: cached_reservation_order(*view, "", RESERVATION_SORT_KEYS[0],
+                                                                  False))
+        ])
+    else:
+        cancel_background_job('view')
+    pending = lambda *stages: view_job is not None and not view_job.ready(*stages)
+    
     # Create tabs
     tab1, tab2, tab3, tab4 = st.tabs(["📊 Reservation Chart", "📈 Overlap Analysis", "🏢 Location Summary", "📋 Reservation List"])
     
     with tab1:
         st.subheader("Reservation Status by Time Slot")
         
+        if location_set:
+            with profiler.stage("location set", rows=len(location_set)):
+                bitsets = cached_occupancy_bitsets(data, grid)
+                matched = bitsets.combine(location_set, set_condition)
+                matched_minutes = int(bitsets.popcount(matched))
+                intervals = bitsets.intervals(matched)
+            share = matched_minutes / len(bitsets.minutes) if len(bitsets.minutes) else 0
+            st.markdown(f"**{set_condition.capitalize()} ({', '.join(location_set)}): "
+                        f"{matched_minutes} of {len(bitsets.minutes)} minutes ({share:.0%}) "
+                        f"in {len(intervals)} intervals**")
+            if intervals:
+                st.dataframe(pd.DataFrame({
+                    'Start': [format_minutes(start, data.dated) for start, _ in intervals],
+                    'End': [format_minutes(end, data.dated) for _, end in intervals],
+                    'Minutes': [end - start for start, end in intervals]
+                }), hide_index=True, use_container_width=True, height=200)
+        
         # Legend
         st.markdown("""
         <div style="display: flex; justify-content: center; gap: 20px; margin-bottom: 20px;">
@@ -601,39 +671,133 @@ def main():
         """, unsafe_allow_html=True)
         
         # Summary heatmap and location details
-        if reservation_data:
-            fig_summary, location_groups = create_heatmap(time_slots, reservation_data, selected_location)
-            st.plotly_chart(fig_summary, use_container_width=True)
+        if len(reservation_data):
+            with profiler.stage("heatmap", rows=len(reservation_data)):
+                fig_summary, location_groups = cached_heatmap(
+                    *view, _figure=st.session_state.get('summary_figure'), _parallel=parallel,
+                    _snapshot=snapshot)
+                st.session_state['summary_figure'] = fig_summary
+            with profiler.stage("emit heatmap", payload=fig_summary):
+                st.plotly_chart(fig_summary, use_container_width=True)
             
-            # Location details with expanders (maintain same order as summary chart)
-            for location in location_groups.keys():  # location_groups is already sorted
-                location_items = location_groups[location]
-                with st.expander(f"🏢 {location} ({len(location_items)} reservations)", expanded=False):
-                    # Create detailed heatmap for this location
-                    fig_detail = create_location_detail_heatmap(location, location_items, time_slots)
+            # Location details (same order as summary chart); only the opened location is built
+            detail_location = st.selectbox(
+                "🏢 Location Details",
+                list(location_groups.keys()),
+                index=None,
+                placeholder="Select a location to view its reservations",
+                format_func=lambda loc: f"{loc} ({len(location_groups[loc])} reservations)"
+            )
+            if detail_location is not None:
+                location_items = location_groups[detail_location]
+                col1, col2 = st.columns(2)
+                with col1:
+                    group_identical = st.checkbox("Collapse identical times", value=True)
+                n_pages = detail_page_count(location_items, group_identical)
+                page = 1
+                if n_pages > 1:
+                    with col2:
+                        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1,
+                                               key="detail_page")
+                
+                # Create detailed heatmap for this location
+                with profiler.stage("location detail", rows=len(location_items)):
+                    fig_detail = cached_location_detail_heatmap(
+                        *view, detail_location, int(page) - 1, group_identical,
+                        _figure=st.session_state.get('detail_figure'))
+                    st.session_state['detail_figure'] = fig_detail
+                with profiler.stage("emit location detail", payload=fig_detail):
                     st.plotly_chart(fig_detail, use_container_width=True)
         else:
             st.info("No reservations to display.")
+        
+        # Free-window search over precomputed per-location minute occupancy
+        if locations:
+            with st.expander("🔎 Find Available Time"):
+                with st.form("find_available"):
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        find_location = st.selectbox(
+                            "Location", locations,
+                            index=locations.index(metric_location) if metric_location else 0)
+                        find_duration = st.number_input("Duration (min)", min_value=0, max_value=720,
+                                                        value=0, step=5)
+                        find_capacity = st.number_input("Capacity", min_value=1,
+                                                        value=max(1, int(capacity)))
+                    with col2:
+                        find_time = st.time_input("Earliest Start", value=time(start_hour))
+                        find_day = start_day
+                        if grid.multi_day:
+                            find_day = date_to_day(st.date_input(
+                                "Earliest Date", value=minutes_to_date(grid.start_minute),
+                                min_value=minutes_to_date(grid.start_minute),
+                                max_value=minutes_to_date(grid.end_minute - 1)))
+                        find_count = st.number_input("Windows", min_value=1, max_value=50, value=5)
+                    submitted = st.form_submit_button("Find")
+                
+                if submitted:
+                    # Every location's rows, one buffer past the grid, as the index needs
+                    availability_data = data
+                    if database_summary is not None:
+                        availability_data = load_database_view(database_path, database_modified,
+                                                               grid, None, grid.max_buffer)
+                    earliest = find_day * MINUTES_PER_DAY + find_time.hour * 60 + find_time.minute
+                    with profiler.stage("availability search", rows=len(availability_data)):
+                        windows = cached_availability_index(availability_data, grid).find(
+                            find_location, int(find_duration), int(find_capacity), earliest,
+                            int(find_count))
+                    if windows:
+                        st.dataframe(pd.DataFrame({
+                            'Earliest Start': [format_minutes(first, data.dated) for first, _ in windows],
+                            'Latest Start': [format_minutes(last, data.dated) for _, last in windows]
+                        }), hide_index=True, use_container_width=True)
+                    else:
+                        st.info(f"No free window at {find_location} in the selected range.")
     
     with tab2:
         st.subheader("Overlap Reservation Analysis")
         
-        overlap_fig = create_overlap_chart(time_slots)
-        if overlap_fig:
-            st.plotly_chart(overlap_fig, use_container_width=True)
-            
-            # Display time slots with high overlap
-            high_overlap_slots = [slot for slot in time_slots if slot['count'] >= 3]
-            if high_overlap_slots:
-                st.warning(f"⚠️ {len(high_overlap_slots)} time slots have 3 or more overlapping reservations.")
+        overlap_fig = None
+        if pending('overlap chart'):
+            show_pending(view_job)
+        else:
+            with profiler.stage("overlap chart", rows=len(time_slots)):
+                overlap_fig = cached_overlap_chart(*view)
+            if overlap_fig:
+                with profiler.stage("emit overlap chart", payload=overlap_fig):
+                    st.plotly_chart(overlap_fig, use_container_width=True)
+        if overlap_fig or pending('overlap chart'):
+            # Busiest location slots, worst first; reservations are listed for the shown ones only
+            col1, col2 = st.columns(2)
+            with col1:
+                hotspot_threshold = st.number_input("Overlap Threshold", min_value=1,
+                                                    value=DEFAULT_HOTSPOT_THRESHOLD,
+                                                    key='hotspot_threshold')
+            with col2:
+                top_k = st.number_input("Slots Shown", min_value=1, max_value=100,
+                                        value=DEFAULT_TOP_SLOTS, key='top_slots')
+            top_slots = None
+            if pending('busiest slots', 'occupancy index'):
+                show_pending(view_job)
+            else:
+                with profiler.stage("busiest slots", rows=len(reservation_data)):
+                    top_slots, n_hotspots = cached_busiest_slots(*view, int(top_k),
+                                                                 int(hotspot_threshold),
+                                                                 _parallel=parallel)
+            if top_slots:
+                st.warning(f"⚠️ {n_hotspots} location time slots have {int(hotspot_threshold)} "
+                           f"or more overlapping reservations.")
                 
-                for slot in high_overlap_slots[:5]:  # Display top 5 only
+                with profiler.stage("occupancy index", rows=len(reservation_data)):
+                    occupancy_index = cached_occupancy_index(*view)
+                for slot in top_slots:
                     reservation_details = []
-                    for res in slot['reservations']:
-                        reservation_details.append(f"ID {res['id']} ({res['location']})")
+                    for res in occupancy_index.covering(slot['minutes'], slot['location']).records():
+                        reservation_details.append(f"ID {res['id']}")
                     
                     st.markdown(f"""
                     <div class="reservation-card">
+                        <span class="location-badge">{slot['location']}</span>
                         <strong>{slot['time']}</strong>
                         <span class="overlap-badge">{slot['count']} Overlaps</span>
                         <br><small>Reservations: {', '.join(reservation_details)}</small>
@@ -641,61 +805,141 @@ def main():
                     """, unsafe_allow_html=True)
         else:
             st.info("No overlapping reservations.")
+        
+        # Every interval over capacity, with the reservations responsible
+        st.subheader("Capacity Conflicts")
+        if pending('capacity conflicts'):
+            show_pending(view_job)
+        else:
+            with profiler.stage("conflicts", rows=len(reservation_data)) as stage:
+                conflicts = cached_conflict_frame(*conflict_view)
+                stage.payload = conflicts.head(CONFLICT_TABLE_ROWS)
+            if len(conflicts):
+                st.warning(f"⚠️ {len(conflicts)} intervals exceed location capacity.")
+                if len(conflicts) > CONFLICT_TABLE_ROWS:
+                    st.caption(f"Showing the first {CONFLICT_TABLE_ROWS} conflicts; "
+                               f"the download has all {len(conflicts)}.")
+                st.dataframe(conflicts.head(CONFLICT_TABLE_ROWS), hide_index=True,
+                             use_container_width=True)
+                st.download_button("Download Conflict Report (CSV)",
+                                   cached_conflict_csv(*conflict_view),
+                                   file_name="conflicts.csv", mime="text/csv")
+            else:
+                st.success("No location exceeds its capacity.")
     
     with tab3:
         st.subheader("Location Summary")
         
-        location_fig = create_location_summary(reservation_data)
-        if location_fig:
-            st.plotly_chart(location_fig, use_container_width=True)
-            
-            # Location breakdown table - sorted by reservation count
-            location_breakdown = {}
-            for item in reservation_data:
-                loc = item['location']
-                if loc not in location_breakdown:
-                    location_breakdown[loc] = []
-                location_breakdown[loc].append(item)
-            
-            # Sort locations by reservation count (descending)
-            sorted_locations_summary = sorted(location_breakdown.keys(), 
-                                            key=lambda loc: len(location_breakdown[loc]), 
-                                            reverse=True)
-            
-            for location in sorted_locations_summary:
-                items = location_breakdown[location]
-                with st.expander(f"🏢 {location} ({len(items)} reservations)"):
-                    for item in sorted(items, key=lambda x: time_to_minutes(x['time'])):
-                        st.write(f"• ID {item['id']} at {item['time']}")
+        if pending('location summary'):
+            show_pending(view_job)
         else:
-            st.info("No location data to display.")
+            with profiler.stage("location summary", rows=len(reservation_data)):
+                location_fig = cached_location_summary(*view)
+            if location_fig:
+                with profiler.stage("emit location summary", payload=location_fig):
+                    st.plotly_chart(location_fig, use_container_width=True)
+                
+                # Location breakdown table - sorted by reservation count (descending)
+                _, location_breakdown = cached_heatmap(*view)
+                if store is not None:
+                    location_peaks = [store.peak(location) for location in location_breakdown]
+                else:
+                    location_peaks = [peaks[location]['count'] for location in location_breakdown]
+                breakdown = pd.DataFrame({
+                    'Location': list(location_breakdown.keys()),
+                    'Reservations': [len(items) for items in location_breakdown.values()],
+                    'First': [format_minutes(int(items.minutes[0]), items.dated)
+                              for items in location_breakdown.values()],
+                    'Last': [format_minutes(int(items.minutes[-1]), items.dated)
+                             for items in location_breakdown.values()],
+                    'Peak Overlap': location_peaks
+                })
+                with profiler.stage("emit location table", rows=len(breakdown), payload=breakdown):
+                    st.dataframe(breakdown, hide_index=True, use_container_width=True)
+            else:
+                st.info("No location data to display.")
     
     with tab4:
         st.subheader("All Reservations")
         
-        if reservation_data:
-            # Sort reservations by location, then by time
-            sorted_reservations = sorted(reservation_data, 
-                                       key=lambda x: (x['location'], time_to_minutes(x['time'])))
+        if len(reservation_data):
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                query = st.text_input("Search", placeholder="Location, ID or time (e.g. 10:3)")
+            with col2:
+                sort_by = st.selectbox("Sort by", RESERVATION_SORT_KEYS)
+            with col3:
+                descending = st.checkbox("Descending")
             
-            for item in sorted_reservations:
-                original_minutes = time_to_minutes(item['time'])
-                start_time = minutes_to_time(original_minutes - 30)
-                end_time = minutes_to_time(original_minutes + 30)
+            if pending('reservation list'):
+                show_pending(view_job)
+            else:
+                with profiler.stage("reservation order", rows=len(reservation_data)):
+                    order = cached_reservation_order(*view, query, sort_by, descending)
+                n_pages = max(1, -(-len(order) // RESERVATION_PAGE_ROWS))
+                page = 1
+                if n_pages > 1:
+                    page = st.number_input("Page", min_value=1, max_value=n_pages, value=1,
+                                           key="reservation_page")
+                page_start = (int(page) - 1) * RESERVATION_PAGE_ROWS
+                rows = order[page_start:page_start + RESERVATION_PAGE_ROWS]
                 
-                st.markdown(f"""
-                <div class="reservation-card">
-                    <span class="location-badge">{item['location']}</span>
-                    <strong>ID #{item['id']}</strong>
-                    <span class="available-badge">Active</span>
-                    <br>
-                    <small>Reservation Time: {item['time']}</small>
-                    <br>
-                    <small>Actual Occupancy: {start_time} ~ {end_time}</small>
-                </div>
-                """, unsafe_allow_html=True)
+                # Cards are only offered while the whole list stays small
+                display_mode = "Table"
+                if len(order) <= CARD_VIEW_MAX_ROWS:
+                    display_mode = st.radio("Display", ["Cards", "Table"], horizontal=True)
+                
+                if len(rows) == 0:
+                    st.info("No reservations match the search.")
+                elif display_mode == "Table":
+                    with profiler.stage("emit reservation page", rows=len(rows)) as stage:
+                        stage.payload = reservation_page_frame(reservation_data, rows, grid)
+                        st.dataframe(stage.payload, hide_index=True, use_container_width=True)
+                else:
+                    with profiler.stage("emit reservation cards", rows=len(rows)):
+                        window_starts, window_ends = grid.windows(reservation_data.take(rows))
+                        for i, window_start, window_end in zip(rows, window_starts.tolist(), window_ends.tolist()):
+                            item = reservation_data.record(i)
+                            start_time = minutes_to_time(window_start)
+                            end_time = minutes_to_time(window_end)
+                            
+                            st.markdown(f"""
+                            <div class="reservation-card">
+                                <span class="location-badge">{item['location']}</span>
+                                <strong>ID #{item['id']}</strong>
+                                <span class="available-badge">Active</span>
+                                <br>
+                                <small>Reservation Time: {format_minutes(int(reservation_data.minutes[i]), reservation_data.dated)}</small>
+                                <br>
+                                <small>Actual Occupancy: {start_time} ~ {end_time}</small>
+                            </div>
+                            """, unsafe_allow_html=True)
+                
+                if len(rows):
+                    st.caption(f"Showing {page_start + 1}-{page_start + len(rows)} of {len(order)} reservations")
         else:
             st.info("No reservations.")
+    
+    # Profiling panel
+    profiler.finish()
+    with st.sidebar.expander("⏱️ Profiling", expanded=profiler.enabled):
+        st.checkbox("Profile reruns", key='profile_reruns',
+                    help="Time each stage of every rerun and log it as JSON lines")
+        st.checkbox("Trace allocations", key='profile_allocations', disabled=not profiler.enabled,
+                    help="Record peak traced memory per stage (slows reruns down)")
+        if profiler.enabled:
+            st.caption(f"Rerun {profiler.run_id} · {profiler.total_seconds * 1000:.0f} ms total")
+            st.dataframe(profiler.frame(), hide_index=True, use_container_width=True,
+                         column_config={
+                             'Wall (ms)': st.column_config.NumberColumn(format="%.1f"),
+                             'Payload (KiB)': st.column_config.NumberColumn(format="%.1f"),
+                             'Peak alloc (KiB)': st.column_config.NumberColumn(format="%.1f")
+                         })
+    
+    # Rerun to fill in the sections as the background work finishes
+    if view_job is not None and not view_job.done:
+        view_job.wait(BACKGROUND_POLL_SECONDS)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""Stage timings and peak memory of the dashboard pipeline on synthetic data
+
+    python benchmarks.py --sizes 1000 100000 1000000 --output bench_output.txt
+
+Each stage is timed (best of --repeat runs) and then run once more under
+tracemalloc for its peak memory, so tracing does not distort the timings.
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+from charts import (create_heatmap, create_location_detail_heatmap, create_location_summary,
+                    create_overlap_chart)
+from reservations import (PARALLEL_EXECUTORS, ParallelConfig, ReservationSet, TimeGrid,
+                          busiest_slots, calculate_peak_overlaps, calculate_time_slots,
+                          generate_synthetic_data,
+                          read_reservations, reservation_page_frame, search_reservations,
+                          sort_reservations)
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+LIST_PAGE_ROWS = 50
+
+def measure(stage, repeat):
+    """Best wall time in seconds and peak traced memory in bytes of a stage"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        stage()
+        best = min(best, time.perf_counter() - started)
+    
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def pipeline_stages(frame, grid, parallel=None):
+    """(name, callable) for every stage, each fed by the previous stages' output"""
+    csv_text = frame.to_csv(index=False)
+    data = ReservationSet.from_frame(frame)
+    time_slots, filtered = calculate_time_slots(data, grid)
+    busiest = max(filtered.present_locations(), key=lambda location: len(filtered.filter_location(location)))
+    
+    def list_prep():
+        order = sort_reservations(filtered, "Location")
+        order = order[search_reservations(filtered, "1")[order]]
+        return reservation_page_frame(filtered, order[:LIST_PAGE_ROWS], grid)
+    
+    return [
+        ("parse csv", lambda: read_reservations(io.StringIO(csv_text))),
+        ("parse frame", lambda: ReservationSet.from_frame(frame)),
+        ("time slots", lambda: calculate_time_slots(data, grid)),
+        ("max overlap", lambda: calculate_peak_overlaps(filtered, grid, parallel)),
+        ("heatmap", lambda: create_heatmap(time_slots, filtered, grid, parallel=parallel)),
+        ("location detail", lambda: create_location_detail_heatmap(
+            busiest, filtered.filter_location(busiest), time_slots, grid)),
+        ("overlap chart", lambda: create_overlap_chart(time_slots)),
+        ("busiest slots", lambda: busiest_slots(filtered, grid, parallel=parallel)),
+        ("location summary", lambda: create_location_summary(filtered)),
+        ("list prep", list_prep),
+    ]
+
+def run(sizes, n_locations, skew, seed, repeat, grid, parallel=None):
+    """Yield (rows, stage, seconds, peak bytes) for every size and stage"""
+    for n in sizes:
+        frame = generate_synthetic_data(n, n_locations, skew, seed)
+        for stage, call in pipeline_stages(frame, grid, parallel):
+            seconds, peak = measure(call, repeat)
+            yield n, stage, seconds, peak
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the reservation pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--locations', type=int, default=20)
+    parser.add_argument('--skew', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--slot-minutes', type=int, default=10)
+    parser.add_argument('--buffer', type=int, default=30)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--executor', choices=PARALLEL_EXECUTORS, default='thread')
+    parser.add_argument('--output', help="also append the results to this file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    grid = TimeGrid(8, 18, args.slot_minutes, args.buffer)
+    header = f"{'rows':>9}  {'stage':<17} {'seconds':>9} {'rows/s':>12} {'peak MiB':>9}"
+    lines = [f"locations={args.locations} skew={args.skew} seed={args.seed} "
+             f"slot={args.slot_minutes}min buffer=±{args.buffer}min repeat={args.repeat} "
+             f"workers={args.workers} executor={args.executor}", header]
+    print('\n'.join(lines), flush=True)
+    
+    parallel = ParallelConfig(args.workers, args.executor)
+    for n, stage, seconds, peak in run(args.sizes, args.locations, args.skew, args.seed,
+                                       args.repeat, grid, parallel):
+        line = (f"{n:>9}  {stage:<17} {seconds:>9.4f} {n / max(seconds, 1e-9):>12,.0f} "
+                f"{peak / 2**20:>9.1f}")
+        lines.append(line)
+        print(line, flush=True)
+    
+    if args.output:
+        with open(args.output, 'a') as output:
+            output.write('\n'.join(lines) + '\n\n')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""Plotly figures for the reservation dashboard"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+from reservations import (format_minutes, group_by_location, location_occupancy_rows, occupancy_bounds,
+                          occupancy_counts, sort_reservations_by_time)
+
+# Lean heatmaps: cell numbers only while the grid is small enough to read them, and
+# wide time axes binned (peak occupancy per bin) down to at most HEATMAP_MAX_COLUMNS
+HEATMAP_TEXT_MAX_CELLS = 3000
+HEATMAP_MAX_COLUMNS = 288
+BIN_MINUTE_STEPS = [5, 10, 15, 20, 30, 60, 90, 120, 180, 240, 360, 720, 1440]
+HEATMAP_COLORSCALE = [
+    [0, 'white'],
+    [0.5, '#ff6b6b'],
+    [1, '#e74c3c']
+]
+
+class TimeAxis:
+    """Heatmap columns: slots of the grid, or bins of consecutive slots for wide grids
+    
+    Bins never cross a day boundary, so the last bin of each day may be
+    narrower. bin_minutes equals the slot width when nothing is binned.
+    """
+    
+    def __init__(self, grid, max_columns=HEATMAP_MAX_COLUMNS):
+        self.bin_minutes = grid.slot_minutes
+        if grid.n_slots > max_columns:
+            wanted = -(-grid.n_slots // max_columns) * grid.slot_minutes
+            self.bin_minutes = next((step for step in BIN_MINUTE_STEPS
+                                     if step >= wanted and step % grid.slot_minutes == 0),
+                                    BIN_MINUTE_STEPS[-1])
+        slots_per_bin = self.bin_minutes // grid.slot_minutes
+        
+        # Bin starts restart at every day's first slot
+        slots_per_day = (grid.end_hour - grid.start_hour) * 60 // grid.slot_minutes
+        n_days = grid.n_slots // slots_per_day
+        self.starts = (np.arange(n_days)[:, None] * slots_per_day
+                       + np.arange(0, slots_per_day, slots_per_bin)[None, :]).reshape(-1)
+        self.binned = slots_per_bin > 1
+        slot_starts = grid.slot_starts()
+        self.labels = [grid.slot_label(minute) for minute in slot_starts[self.starts].tolist()]
+        self.gridline_step = max(1, grid.gridline_step // slots_per_bin)
+    
+    def __len__(self):
+        return len(self.starts)
+    
+    def reduce(self, matrix):
+        """Peak of every bin for each row of a rows × slots matrix"""
+        matrix = np.asarray(matrix)
+        if not self.binned or matrix.size == 0:
+            return matrix
+        return np.maximum.reduceat(matrix, self.starts, axis=-1)
+    
+    def title(self):
+        """X axis title, noting the bin width when binned"""
+        return f"Time (peak per {self.bin_minutes}-minute bin)" if self.binned else "Time"
+    
+    def layout(self):
+        """X axis layout: category labels every gridline_step columns"""
+        return dict(
+            title=self.title(),
+            tickangle=45,
+            tickmode='linear',
+            dtick=self.gridline_step  # Display at gridline intervals
+        )
+    
+    def gridlines(self, n_rows):
+        """All dotted gridlines as a single path shape (heatmap cells would hide axis gridlines)"""
+        path = ''.join(f"M{x},-0.5V{n_rows - 0.5}" for x in range(0, len(self), self.gridline_step))
+        return dict(type="path", path=path, xref="x", yref="y",
+                    line=dict(color="rgba(128,128,128,0.3)", width=0.5, dash="dash"))
+
+def heatmap_figure(figure, kind, style, layout, **data):
+    """Heatmap figure with the given trace data, reusing figure when it is of the same kind
+    
+    style and layout hold the properties that do not depend on the data;
+    they are only set (and validated) when a new figure is built. A reused
+    figure is updated in place, so callers must own it.
+    """
+    if figure is None or figure.layout.meta != kind or len(figure.data) != 1:
+        figure = go.Figure(data=go.Heatmap(**style, **data))
+        figure.update_layout(meta=kind, **layout)
+        return figure
+    figure.data[0].update(**data)
+    return figure
+
+def cell_text(z, max_cells=HEATMAP_TEXT_MAX_CELLS):
+    """Nonzero cell values as strings, or None when the grid is too large to label"""
+    z = np.asarray(z)
+    if z.size > max_cells:
+        return None
+    return np.where(z > 0, z.astype(str), '')
+
+SUMMARY_HEATMAP_STYLE = dict(
+    colorscale=HEATMAP_COLORSCALE,
+    showscale=True,
+    colorbar=dict(
+        title="Reservations",
+        tickmode="linear",
+        tick0=0,
+        dtick=1
+    ),
+    texttemplate="%{text}",
+    textfont={"size": 12, "color": "white"},
+    hoverongaps=False,
+    hovertemplate="<b>%{y}</b><br>Time: %{x}<br>Reservations: %{z}<extra></extra>"
+)
+SUMMARY_HEATMAP_LAYOUT = dict(
+    yaxis_title="Locations",
+    yaxis=dict(
+        tickfont=dict(size=11),
+        autorange='reversed'  # Reverse y-axis to show highest count at top
+    ),
+    margin=dict(l=250, r=50, t=50, b=100),
+    showlegend=False
+)
+
+def create_heatmap(time_slots, data, grid, selected_location=None, figure=None, parallel=None,
+                   snapshot=None):
+    """Create heatmap chart grouped by location with expandable details
+    
+    Pass a previous summary figure to update it instead of building a new one,
+    a ParallelConfig to compute the location rows in a pool, or an
+    OccupancySnapshot of the same data and grid to read them from.
+    """
+    # Time axis, binned for wide grids
+    axis = TimeAxis(grid)
+    
+    # Group data by location, sorted by number of reservations (descending)
+    location_groups = group_by_location(data)
+    sorted_locations = list(location_groups.keys())
+    
+    # Create summary heatmap (only totals) from the occupancy engine
+    if snapshot is not None:
+        rows = snapshot.rows(sorted_locations)
+    else:
+        rows = location_occupancy_rows(data, sorted_locations, grid, parallel)
+    z_data_summary = axis.reduce(rows)
+    y_labels_summary = [f"🏢 {location} ({len(location_groups[location])} reservations)"
+                        for location in sorted_locations]
+    
+    # Create summary heatmap (reverse y-axis order to show highest count first)
+    fig_summary = heatmap_figure(
+        figure, 'summary', SUMMARY_HEATMAP_STYLE, SUMMARY_HEATMAP_LAYOUT,
+        z=z_data_summary,
+        x=axis.labels,
+        y=y_labels_summary,
+        text=cell_text(z_data_summary)
+    )
+    
+    title = f"Time Reservation Summary by Location ({grid.buffer_label()} applied)"
+    if selected_location and selected_location != "All Locations":
+        title += f" - {selected_location}"
+    
+    fig_summary.update_layout(
+        title=title,
+        height=max(400, len(sorted_locations) * 50 + 100),
+        xaxis=axis.layout(),
+        shapes=[axis.gridlines(len(y_labels_summary))]  # Dotted lines at GRIDLINE_MINUTES intervals
+    )
+    
+    # Return sorted location groups to maintain order
+    return fig_summary, location_groups
+
+# Rows per page of the location detail heatmap
+DETAIL_PAGE_ROWS = 40
+
+def detail_row_groups(location_items, group_identical=True):
+    """Rows of the detail view, latest first, as (first position, reservation count)
+    
+    With group_identical, reservations at the same minute share one row.
+    """
+    minutes = location_items.minutes
+    if group_identical:
+        starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+        counts = np.diff(np.r_[starts, len(minutes)])
+    else:
+        starts = np.arange(len(minutes))
+        counts = np.ones(len(minutes), dtype=np.int64)
+    return starts[::-1], counts[::-1]
+
+def detail_page_count(location_items, group_identical=True, page_rows=DETAIL_PAGE_ROWS):
+    """Number of detail heatmap pages for a location"""
+    starts, _ = detail_row_groups(location_items, group_identical)
+    return max(1, -(-len(starts) // page_rows))
+
+DETAIL_HEATMAP_STYLE = dict(
+    colorscale=HEATMAP_COLORSCALE,
+    showscale=False,  # Remove color bar (legend)
+    texttemplate="%{text}",
+    textfont={"size": 12, "color": "white"},
+    hoverongaps=False,
+    hovertemplate="<b>%{y}</b><br>Time: %{x}<br>Value: %{z}<extra></extra>"
+)
+DETAIL_HEATMAP_LAYOUT = dict(
+    yaxis_title="Reservation Details",
+    yaxis=dict(
+        tickfont=dict(size=10)
+    ),
+    margin=dict(l=200, r=50, t=50, b=80),
+    showlegend=False
+)
+
+def create_location_detail_heatmap(location, location_items, time_slots, grid, page=0,
+                                   group_identical=True, page_rows=DETAIL_PAGE_ROWS, figure=None):
+    """Create detailed heatmap for a specific location, one page of rows at a time
+    
+    Pass a previous detail figure to update it instead of building a new one.
+    """
+    # Time axis, binned for wide grids
+    axis = TimeAxis(grid)
+    
+    # Sort items by time within location (earliest first)
+    location_items_sorted = sort_reservations_by_time(location_items)
+    
+    # Location total row covers every reservation, not just the current page
+    starts, ends = grid.windows(location_items_sorted)
+    location_total_row = occupancy_counts(starts, ends, grid)
+    
+    # Rows on this page (latest first); a collapsed row holds its reservation count
+    positions, counts = detail_row_groups(location_items_sorted, group_identical)
+    n_rows = len(positions)
+    page_slice = slice(page * page_rows, (page + 1) * page_rows)
+    positions, counts = positions[page_slice], counts[page_slice]
+    minutes = location_items_sorted.minutes[positions]
+    first, last = occupancy_bounds(starts[positions], ends[positions], grid)
+    slot_index = np.arange(grid.n_slots)
+    rows = ((slot_index >= first[:, None]) & (slot_index < last[:, None])) * counts[:, None]
+    
+    # Reservation rows first (reversed so latest shows first), TOTAL row at the END
+    # (so it appears at TOP of chart)
+    z_data_detail = axis.reduce(np.vstack([rows, location_total_row]))
+    y_labels_detail = []
+    for position, count, minute in zip(positions, counts, minutes):
+        reservation_id = location_items_sorted.ids[position]
+        time_label = format_minutes(int(minute), location_items_sorted.dated)
+        if count > 1:
+            y_labels_detail.append(f"{count} × {time_label} (ID {reservation_id}, +{count - 1} more)")
+        else:
+            y_labels_detail.append(f"ID {reservation_id} ({time_label})")
+    
+    y_labels_detail.append(f"📊 TOTAL ({len(location_items)} reservations)")
+    
+    # Numbers for the TOTAL row only
+    text = cell_text(z_data_detail)
+    if text is not None:
+        text[:-1] = ''
+    
+    # Create detailed heatmap
+    fig_detail = heatmap_figure(
+        figure, 'detail', DETAIL_HEATMAP_STYLE, DETAIL_HEATMAP_LAYOUT,
+        z=z_data_detail,
+        x=axis.labels,
+        y=y_labels_detail,
+        text=text
+    )
+    
+    title = f"Detailed View: {location}"
+    if n_rows > page_rows:
+        title += f" (rows {page_slice.start + 1}-{page_slice.start + len(positions)} of {n_rows})"
+    
+    fig_detail.update_layout(
+        title=title,
+        height=max(300, (len(positions) + 1) * 25 + 100),  # +1 for total row
+        xaxis=axis.layout(),
+        shapes=[axis.gridlines(len(y_labels_detail))]  # Dotted lines at GRIDLINE_MINUTES intervals
+    )
+    
+    return fig_detail
+
+def create_overlap_chart(time_slots):
+    """Overlap reservation distribution chart"""
+    overlap_counts = {}
+    for slot in time_slots:
+        count = slot['count']
+        if count > 0:
+            overlap_counts[count] = overlap_counts.get(count, 0) + 1
+    
+    if overlap_counts:
+        counts = list(overlap_counts.keys())
+        frequencies = list(overlap_counts.values())
+        
+        fig = px.bar(
+            x=counts,
+            y=frequencies,
+            labels={'x': 'Concurrent Reservations', 'y': 'Time Slot Count'},
+            title='Concurrent Reservation Distribution',
+            color=counts,
+            color_continuous_scale='Reds'
+        )
+        
+        fig.update_traces(
+            text=frequencies,
+            textposition='outside'
+        )
+        
+        fig.update_layout(height=400)
+        return fig
+    
+    return None
+
+def create_location_summary(data):
+    """Create location-wise summary"""
+    location_counts = data.location_counts()
+    present = np.flatnonzero(location_counts)
+    
+    if len(present):
+        locations = [data.locations[code] for code in present]
+        counts = location_counts[present].tolist()
+        
+        fig = px.pie(
+            values=counts,
+            names=locations,
+            title='Reservations by Location'
+        )
+        
+        fig.update_layout(height=400)
+        return fig
+    
+    return None
@@ -0,0 +1,149 @@
+"""Opt-in per-stage profiling of a dashboard rerun
+
+A disabled StageProfiler costs one context manager per stage and measures
+nothing. Enabled, it records wall time, rows processed, payload size and
+traced allocations (net and peak, via tracemalloc) per stage, and writes
+every stage as a JSON log line on the 'reservations.profile' logger.
+Stages are flat: a stage opened inside another resets the outer peak.
+
+tracemalloc is process-wide, so tracing is shared by every profiler in the
+process: it starts with the first profiler that traces and stops when the
+last one finishes. While reruns overlap, their stages also count each
+other's allocations.
+"""
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger('reservations.profile')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+def _acquire_tracing():
+    """Register one more user of allocation tracing, starting it if nothing traces yet"""
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        _tracing_users += 1
+
+def _release_tracing():
+    """Drop one user of allocation tracing, stopping it after the last if it was started here"""
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+def payload_bytes(payload):
+    """Approximate serialized size of a figure, DataFrame or string sent to the browser"""
+    if payload is None:
+        return None
+    if hasattr(payload, 'to_json') and hasattr(payload, 'layout'):
+        return len(payload.to_json())
+    if isinstance(payload, pd.DataFrame):
+        return int(payload.memory_usage(index=True, deep=True).sum())
+    return len(str(payload).encode())
+
+class StageRecord:
+    """Measurements of one stage; rows and payload may be set inside the stage"""
+    
+    def __init__(self, name, rows=None, payload=None):
+        self.name = name
+        self.rows = rows
+        self.payload = payload
+        self.seconds = 0.0
+        self.payload_bytes = None
+        self.allocated_bytes = None
+        self.peak_bytes = None
+
+class StageProfiler:
+    """Collects StageRecords for one rerun when enabled"""
+    
+    def __init__(self, enabled=False, trace_memory=True, run_id=None):
+        self.enabled = enabled
+        self.run_id = run_id
+        self.records = []
+        self._started = time.perf_counter()
+        self._finished = False
+        self.trace_memory = enabled and trace_memory
+        if self.trace_memory:
+            _acquire_tracing()
+    
+    @contextmanager
+    def stage(self, name, rows=None, payload=None):
+        """Time the enclosed block; yields the StageRecord so callers can set rows or payload"""
+        record = StageRecord(name, rows, payload)
+        if not self.enabled:
+            yield record
+            return
+        
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            allocated_before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.seconds = time.perf_counter() - started
+            if tracing and tracemalloc.is_tracing():
+                current, peak = tracemalloc.get_traced_memory()
+                record.allocated_bytes = current - allocated_before
+                record.peak_bytes = peak - allocated_before
+            record.payload_bytes = payload_bytes(record.payload)
+            self.records.append(record)
+    
+    @property
+    def total_seconds(self):
+        return time.perf_counter() - self._started
+    
+    def finish(self):
+        """Release allocation tracing and log every stage; later calls do nothing"""
+        if self._finished:
+            return
+        self._finished = True
+        if self.trace_memory:
+            _release_tracing()
+        if not self.enabled:
+            return
+        for record in self.records:
+            logger.info(json.dumps({
+                'event': 'stage',
+                'run': self.run_id,
+                'stage': record.name,
+                'wall_ms': round(record.seconds * 1000, 3),
+                'rows': record.rows,
+                'payload_bytes': record.payload_bytes,
+                'allocated_bytes': record.allocated_bytes,
+                'peak_bytes': record.peak_bytes
+            }))
+        logger.info(json.dumps({'event': 'rerun', 'run': self.run_id,
+                                'wall_ms': round(self.total_seconds * 1000, 3)}))
+    
+    def frame(self):
+        """Per-stage breakdown as a DataFrame"""
+        return pd.DataFrame({
+            'Stage': [record.name for record in self.records],
+            'Wall (ms)': [record.seconds * 1000 for record in self.records],
+            'Rows': pd.Series([record.rows for record in self.records], dtype='Int64'),
+            'Payload (KiB)': [None if record.payload_bytes is None else record.payload_bytes / 1024
+                              for record in self.records],
+            'Peak alloc (KiB)': [None if record.peak_bytes is None else record.peak_bytes / 1024
+                                 for record in self.records]
+        })
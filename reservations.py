@@ -0,0 +1,2356 @@
+"""Reservation occupancy computations, independent of the Streamlit app
+
+Importable by batch jobs without pulling in Streamlit or Plotly; pyarrow
+is only imported when Parquet or Arrow files are read. Run as a script
+for a command-line report of per-location occupancy and peak overlap:
+
+    python reservations.py reservations.csv --start-hour 8 --end-hour 18
+
+A SQLite file (.db, .sqlite) built with --save-db is read with indexed
+queries instead of being parsed again. With --snapshot, occupancy and
+peaks are saved next to the source file and memory-mapped on later runs.
+"""
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import pathlib
+import random
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+# Updated sample data with location, id, time structure
+def generate_sample_data():
+    locations = ["Sample 1", "Sample 2", "Sample 3", "Sample 4", "Sample 5"]
+    sample_times = [
+        "18:00", "15:00", "07:00", "12:00", "12:00", "17:00", "10:00", "10:00", 
+        "14:00", "12:00", "10:30", "15:00", "18:30", "12:00", "14:00", "08:00",
+        "07:00", "15:00", "16:30", "10:00", "06:30", "14:31", "09:50", "21:30",
+        "21:00", "22:00", "20:30", "19:00", "16:00", "11:00", "13:30", "09:00",
+        "20:00", "22:30", "11:30", "13:00", "16:45", "08:30", "19:30", "17:45"
+    ]
+    
+    data = []
+    for i in range(40):  # Generate 40 sample records
+        data.append({
+            'location': random.choice(locations),
+            'id': int(4.2e8 + random.randint(0, int(2e9))),  # Similar to your ID range
+            'time': sample_times[i % len(sample_times)]
+        })
+    
+    return data
+
+# Busy hours (minutes from midnight) that skewed synthetic times cluster around
+SYNTHETIC_PEAK_MINUTES = [12 * 60, 18 * 60]
+SYNTHETIC_PEAK_SPREAD = 45
+
+def generate_synthetic_data(n=1000, n_locations=10, skew=0.0, seed=None, days=0):
+    """Synthetic raw reservations as a DataFrame of location, id and time strings
+    
+    skew=0 spreads times uniformly over the day; larger values put a
+    growing share (skew / (1 + skew)) of them around the lunch and evening
+    peaks. days > 0 spreads reservations over that many days from
+    2024-01-01 and writes full date-times instead of 'HH:MM'.
+    """
+    rng = np.random.default_rng(seed)
+    locations = np.array([f"Location {i + 1}" for i in range(n_locations)], dtype=object)
+    
+    minutes = rng.integers(0, MINUTES_PER_DAY, size=n)
+    peaked = rng.random(n) < skew / (1 + skew)
+    centers = rng.choice(SYNTHETIC_PEAK_MINUTES, size=int(peaked.sum()))
+    spread = rng.normal(0, SYNTHETIC_PEAK_SPREAD, size=len(centers))
+    minutes[peaked] = np.clip(np.round(centers + spread), 0, MINUTES_PER_DAY - 1)
+    
+    times = (pd.Series(minutes // 60).astype(str).str.zfill(2) + ':'
+             + pd.Series(minutes % 60).astype(str).str.zfill(2))
+    if days > 0:
+        day_offsets = rng.integers(0, days, size=n)
+        dates = (pd.Timestamp('2024-01-01') + pd.to_timedelta(day_offsets, unit='D')).strftime('%Y-%m-%d')
+        times = pd.Series(dates, dtype=object) + ' ' + times
+    
+    return pd.DataFrame({
+        'location': locations[rng.integers(0, n_locations, size=n)],
+        'id': rng.permutation(n).astype(np.int64) + int(4.2e8),
+        'time': times.to_numpy(dtype=object)
+    })
+
+def time_to_minutes(time_str):
+    """Convert an 'HH:MM' or 'HH:MM:SS' string to minutes, raising ValueError if malformed"""
+    minutes, errors = _clock_minutes([time_str])
+    if errors[0]:
+        raise ValueError(f"Invalid time: {time_str!r}")
+    return int(minutes[0])
+
+def minutes_to_time(minutes):
+    """Convert minutes to time string (wrapping around midnight)"""
+    hours = (minutes // 60) % 24
+    mins = minutes % 60
+    return f"{hours:02d}:{mins:02d}"
+
+# Reservation minutes count from midnight of this date; undated times fall on day 0
+EPOCH_DATE = datetime(1970, 1, 1).date()
+MINUTES_PER_DAY = 24 * 60
+
+def minutes_to_date(minutes):
+    """Convert minutes since the epoch to a date"""
+    return EPOCH_DATE + timedelta(days=int(minutes // MINUTES_PER_DAY))
+
+def date_to_day(value):
+    """Days since the epoch for a date"""
+    return (value - EPOCH_DATE).days
+
+def format_minutes(minutes, dated=False):
+    """Time label, prefixed with the date for dated reservations"""
+    if dated:
+        return f"{minutes_to_date(minutes).isoformat()} {minutes_to_time(minutes)}"
+    return minutes_to_time(minutes)
+
+class ReservationSet:
+    """Columnar reservation store
+    
+    Holds int32 minutes since the epoch, categorical location codes
+    (indices into ``locations``) and int64 ids. Times are parsed once when
+    the set is built and rows are kept in time order, so location filters
+    are a code comparison, and time ranges and days are contiguous runs
+    found by binary search over ``minutes``. Time-only data is undated and
+    falls on day 0.
+    """
+    
+    def __init__(self, minutes, codes, ids, locations, dated=False):
+        self.minutes = np.asarray(minutes, dtype=np.int32)
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.locations = list(locations)
+        self.dated = dated
+        # Rows dropped while parsing the source of this set, if it was built from raw columns
+        self.rejected = RejectedRows()
+        self._content_hash = None
+    
+    @classmethod
+    def from_columns(cls, locations, ids, times, dates=None):
+        """Build a time-ordered set from raw location, id, time and optional date columns"""
+        builder = ReservationSetBuilder()
+        builder.add_chunk(locations, ids, times, dates)
+        return builder.build()
+    
+    @classmethod
+    def from_records(cls, records):
+        """Build a set from a list of {'location', 'id', 'time'[, 'date']} dicts"""
+        dates = None
+        if any('date' in item for item in records):
+            dates = [item.get('date') for item in records]
+        return cls.from_columns([item['location'] for item in records],
+                                [item['id'] for item in records],
+                                [item['time'] for item in records],
+                                dates)
+    
+    @classmethod
+    def from_frame(cls, df):
+        """Build a set from a DataFrame with location, id and time columns"""
+        builder = ReservationSetBuilder()
+        builder.add_frame(df)
+        return builder.build()
+    
+    def __len__(self):
+        return len(self.minutes)
+    
+    @property
+    def content_hash(self):
+        """Digest of the columns and location categories, used as a cache key"""
+        if self._content_hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for column in (self.minutes, self.codes, self.ids):
+                digest.update(np.ascontiguousarray(column).data)
+            digest.update(repr((self.locations, self.dated)).encode())
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+    
+    def take(self, index):
+        """Subset by slice, boolean mask or positions (positions should stay time-ordered)"""
+        return ReservationSet(self.minutes[index], self.codes[index], self.ids[index],
+                              self.locations, self.dated)
+    
+    def concat(self, other):
+        """Combine two sets, merging their location categories"""
+        locations = list(self.locations)
+        code_of = {location: code for code, location in enumerate(locations)}
+        for location in other.locations:
+            if location not in code_of:
+                code_of[location] = len(locations)
+                locations.append(location)
+        remap = np.array([code_of[location] for location in other.locations], dtype=np.int32)
+        minutes = np.concatenate([self.minutes, other.minutes])
+        codes = np.concatenate([self.codes, remap[other.codes]])
+        ids = np.concatenate([self.ids, other.ids])
+        
+        order = np.argsort(minutes, kind='stable')
+        return ReservationSet(minutes[order], codes[order], ids[order], locations,
+                              self.dated or other.dated)
+    
+    def filter_location(self, location):
+        """Reservations at a single location"""
+        if location not in self.locations:
+            return self.take(slice(0, 0))
+        return self.take(self.codes == self.locations.index(location))
+    
+    def between(self, start_minute, end_minute):
+        """Reservations with start_minute <= time < end_minute"""
+        lo = np.searchsorted(self.minutes, start_minute, side='left')
+        hi = np.searchsorted(self.minutes, end_minute, side='left')
+        return self.take(slice(lo, hi))
+    
+    def days(self):
+        """Distinct days (since the epoch) that have reservations"""
+        return np.unique(self.minutes // MINUTES_PER_DAY)
+    
+    def on_days(self, first_day, last_day):
+        """Reservations from first_day through last_day, a contiguous run of rows"""
+        return self.between(first_day * MINUTES_PER_DAY, (last_day + 1) * MINUTES_PER_DAY)
+    
+    def location_counts(self):
+        """Number of reservations per location code"""
+        return np.bincount(self.codes, minlength=len(self.locations))
+    
+    def present_locations(self):
+        """Locations that have at least one reservation in this set"""
+        return [self.locations[code] for code in np.flatnonzero(self.location_counts())]
+    
+    def record(self, i):
+        """Row i as a {'location', 'id', 'time'[, 'date']} dict"""
+        minute = int(self.minutes[i])
+        item = {
+            'location': self.locations[self.codes[i]],
+            'id': int(self.ids[i]),
+            'time': minutes_to_time(minute)
+        }
+        if self.dated:
+            item['date'] = minutes_to_date(minute).isoformat()
+        return item
+    
+    def records(self):
+        """Rows as record dicts, in time order"""
+        return [self.record(i) for i in range(len(self))]
+
+# pandas 2 infers one format from the first value unless told the column is mixed
+_MIXED_FORMAT = {'format': 'mixed'} if int(pd.__version__.split('.')[0]) >= 2 else {}
+
+# A date inside a string: 2024-01-31, 31/01/2024, 2024.01.31, Jan 31 or 31 January
+_DATE_PATTERN = r'\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}|[A-Za-z]{3,}\.?\s+\d{1,2}|\d{1,2}\s+[A-Za-z]{3,}'
+
+def _datetimes_to_minutes(values):
+    """Minutes since the epoch for date-time values, or -1 where they do not parse
+    
+    Only date and date-time objects, and strings that contain a date, are
+    parsed: numbers would be read as offsets from the epoch and bare clock
+    times as today's date. Values with a UTC offset or time zone are
+    converted to UTC; naive values keep their wall time.
+    """
+    values = pd.Series(values, dtype=object)
+    text = values.astype(str)
+    is_text = values.to_numpy() == text.to_numpy()
+    candidates = is_text & text.str.contains(_DATE_PATTERN).to_numpy(dtype=bool)
+    others = np.flatnonzero(~is_text)
+    candidates[others] = [isinstance(value, (date, np.datetime64)) for value in values.iloc[others]]
+    
+    minutes = np.full(len(values), -1, dtype=np.int64)
+    if not candidates.any():
+        return minutes
+    # Converting to UTC whatever else is in the column keeps a value's minute
+    # independent of the chunk it is parsed with
+    stamps = pd.to_datetime(values[candidates], errors='coerce', utc=True, **_MIXED_FORMAT)
+    stamps = stamps.dt.tz_localize(None)
+    valid = stamps.notna().to_numpy()
+    parsed = np.full(len(stamps), -1, dtype=np.int64)
+    parsed[valid] = stamps[valid].to_numpy().astype('datetime64[m]').astype(np.int64)
+    minutes[candidates] = parsed
+    return minutes
+
+# Why a row was rejected at parse time; error code i + 1 is PARSE_ERRORS[i], 0 is a valid row
+PARSE_ERRORS = ['missing time', 'invalid time', 'missing date', 'invalid date', 'missing id',
+                'invalid id', 'missing location']
+(MISSING_TIME, INVALID_TIME, MISSING_DATE, INVALID_DATE, MISSING_ID, INVALID_ID,
+ MISSING_LOCATION) = range(1, len(PARSE_ERRORS) + 1)
+
+_CLOCK_PATTERN = r'^\s*(\d{1,2}):(\d{2})(?::(\d{2}))?\s*(?:([AaPp])\.?[Mm]\.?)?\s*$'
+# Longest string that can hold a clock time with an AM/PM suffix and some whitespace
+_CLOCK_MAX_LENGTH = 18
+
+def _clock_minutes(values):
+    """Minutes and error codes for 'HH:MM[:SS][ AM|PM]' strings; error 0 marks a valid clock time
+    
+    Values that are not clock strings at all get MISSING_TIME or
+    INVALID_TIME; seconds are truncated to the minute. Only short strings
+    that match are split into fields, so date-time columns skip that step.
+    """
+    values = pd.Series(values, dtype=object)
+    text = values.astype(str)
+    missing = values.isna().to_numpy().copy()
+    short = np.flatnonzero((text.str.len().to_numpy() <= _CLOCK_MAX_LENGTH) & ~missing)
+    text = text.iloc[short]
+    missing[short[text.str.strip().eq('').to_numpy()]] = True
+    short = short[text.str.match(_CLOCK_PATTERN).to_numpy(dtype=bool)]
+    
+    parts = text.loc[short].str.extract(_CLOCK_PATTERN)
+    hours = pd.to_numeric(parts[0]).fillna(-1).to_numpy(dtype=np.int64)
+    minutes = pd.to_numeric(parts[1]).fillna(0).to_numpy(dtype=np.int64)
+    seconds = pd.to_numeric(parts[2]).fillna(0).to_numpy(dtype=np.int64)
+    meridiem = parts[3].str.lower().to_numpy(dtype=object)
+    twelve_hour = pd.notna(meridiem)
+    valid = ((hours >= 0) & (hours < 24) & (minutes < 60) & (seconds < 60)
+             & ~(twelve_hour & ((hours < 1) | (hours > 12))))
+    hours = np.where(twelve_hour, hours % 12 + np.where(meridiem == 'p', 12, 0), hours)
+    
+    parsed = np.full(len(values), -1, dtype=np.int64)
+    parsed[short] = hours * 60 + minutes
+    errors = np.full(len(values), INVALID_TIME, dtype=np.int8)
+    errors[short[valid]] = 0
+    errors[missing] = MISSING_TIME
+    return parsed, errors
+
+def parse_time_column(times, dates=None):
+    """Parse a time column to int32 minutes since the epoch, each distinct value once
+    
+    'HH:MM' and 'HH:MM:SS' values, optionally with AM/PM, fall on day 0
+    unless a date column is given; date-time values carry their own date,
+    and next to them clock times are rejected as missing a date. Numbers
+    and anything else without a date are rejected. Returns (minutes,
+    dated, errors), where errors holds a PARSE_ERRORS code per row (0 for
+    rows that parsed) and the minutes of rejected rows are meaningless.
+    """
+    time_codes, time_values = pd.factorize(pd.Series(times, dtype=object), use_na_sentinel=False)
+    parsed, value_errors = _clock_minutes(time_values)
+    
+    dated = False
+    other = value_errors == INVALID_TIME
+    if other.any():
+        clock = value_errors == 0
+        stamps = _datetimes_to_minutes(time_values[other])
+        parsed[other] = stamps
+        value_errors[np.flatnonzero(other)[stamps >= 0]] = 0
+        dated = bool((stamps >= 0).any())
+        if dated and dates is None:
+            value_errors[clock] = MISSING_DATE
+    minutes = parsed[time_codes] if len(time_codes) else np.zeros(0, dtype=np.int64)
+    errors = value_errors[time_codes] if len(time_codes) else np.zeros(0, dtype=np.int8)
+    
+    if dates is not None:
+        date_codes, date_values = pd.factorize(pd.Series(dates, dtype=object), use_na_sentinel=False)
+        stamps = _datetimes_to_minutes(date_values)
+        date_errors = np.where(stamps >= 0, 0, INVALID_DATE).astype(np.int8)
+        date_errors[pd.isna(pd.Series(date_values, dtype=object)).to_numpy()] = MISSING_DATE
+        if len(date_codes):
+            days = np.maximum(stamps, 0) // MINUTES_PER_DAY
+            minutes = days[date_codes] * MINUTES_PER_DAY + minutes % MINUTES_PER_DAY
+            errors = np.where(errors == 0, date_errors[date_codes], errors)
+        dated = True
+    return minutes.astype(np.int32), dated, errors
+
+def parse_id_column(ids):
+    """Parse an id column to int64, returning (ids, errors) with a PARSE_ERRORS code per row
+    
+    Integer strings are converted exactly; other numbers must be whole.
+    The ids of rejected rows are meaningless.
+    """
+    ids = pd.Series(ids)
+    missing = ids.isna().to_numpy().copy()
+    if pd.api.types.is_integer_dtype(ids.dtype) and not missing.any():
+        return ids.to_numpy(dtype=np.int64), np.zeros(len(ids), dtype=np.int8)
+    
+    text = ids.astype(str).str.strip()
+    missing |= text.eq('').to_numpy()
+    digits = text.str.fullmatch(r'[-+]?\d{1,18}').to_numpy(dtype=bool) & ~missing
+    parsed = np.zeros(len(ids), dtype=np.int64)
+    parsed[digits] = text[digits].to_numpy(dtype=object).astype(np.int64)
+    errors = np.where(missing, MISSING_ID, 0).astype(np.int8)
+    
+    rest = np.flatnonzero(~digits & ~missing)
+    if len(rest):
+        numbers = pd.to_numeric(ids.iloc[rest], errors='coerce').to_numpy(dtype=np.float64)
+        whole = (numbers % 1 == 0) & (np.abs(numbers) < 2.0 ** 63)
+        parsed[rest[whole]] = numbers[whole].astype(np.int64)
+        errors[rest[~whole]] = INVALID_ID
+    return parsed, errors
+
+class RejectedRows:
+    """Rows dropped while parsing because a location, id, time or date did not parse
+    
+    Row numbers count data rows from 1 in input order (a CSV header line is
+    not counted); values are the raw field that was rejected.
+    """
+    
+    def __init__(self, rows=None, errors=None, values=None):
+        self.rows = np.zeros(0, dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int8) if errors is None else np.asarray(errors, dtype=np.int8)
+        self.values = np.zeros(0, dtype=object) if values is None else np.asarray(values, dtype=object)
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def counts(self):
+        """Number of rejected rows per reason, for reasons that occur"""
+        counts = np.bincount(self.errors, minlength=len(PARSE_ERRORS) + 1)
+        return {PARSE_ERRORS[code - 1]: int(counts[code]) for code in np.flatnonzero(counts)}
+    
+    def summary(self):
+        """One-line description such as '3 rows skipped (2 invalid time, 1 missing date)'"""
+        reasons = ', '.join(f"{count} {reason}" for reason, count in self.counts().items())
+        return f"{len(self)} row{'s' if len(self) != 1 else ''} skipped ({reasons})"
+    
+    def frame(self, limit=None):
+        """Table of the first limit rejected rows (all of them by default)"""
+        rows = slice(0, limit)
+        return pd.DataFrame({
+            'Row': self.rows[rows],
+            'Reason': [PARSE_ERRORS[code - 1] for code in self.errors[rows]],
+            'Value': [None if pd.isna(value) else str(value) for value in self.values[rows]]
+        })
+
+class ReservationSetBuilder:
+    """Accumulates column chunks into a ReservationSet
+    
+    Each chunk is reduced to compact arrays as soon as it arrives, so the
+    raw strings of only one chunk are alive at a time. Once any chunk is
+    dated, clock-only rows of every chunk are rejected as missing a date;
+    rows of earlier chunks are reported with their time as 'HH:MM'.
+    """
+    
+    def __init__(self):
+        self._minutes = []
+        self._codes = []
+        self._ids = []
+        self._code_of = {}
+        self._dated = False
+        self._rows_seen = 0
+        self._rejected = []
+        # First row, row count and kept-row mask (None if all kept) of chunks added while undated
+        self._undated_chunks = []
+    
+    def add_chunk(self, locations, ids, times, dates=None):
+        """Append one chunk of raw location, id, time and optional date columns
+        
+        Rows with a blank location, or an id, time or date that does not
+        parse, are dropped and recorded for the RejectedRows report of the
+        built set; a row's first problem in that order is reported.
+        """
+        minutes, dated, errors = parse_time_column(times, dates)
+        if self._dated and not dated:
+            errors[errors == 0] = MISSING_DATE
+        elif dated and not self._dated:
+            self._reject_undated_chunks()
+        raw_ids = np.asarray(ids, dtype=object)
+        ids, id_errors = parse_id_column(ids)
+        locations = np.asarray(locations, dtype=object)
+        blank = pd.Series(locations, dtype=object).astype(str).str.strip().eq('').to_numpy()
+        errors = np.where(id_errors != 0, id_errors, errors)
+        errors[pd.isna(locations) | blank] = MISSING_LOCATION
+        bad = np.flatnonzero(errors)
+        if len(bad):
+            field = np.select([errors[bad] <= INVALID_TIME, errors[bad] <= INVALID_DATE,
+                               errors[bad] <= INVALID_ID], [0, 1, 2], 3)
+            raw = np.stack([np.asarray(times, dtype=object)[bad],
+                            np.asarray(times if dates is None else dates, dtype=object)[bad],
+                            raw_ids[bad], locations[bad]])
+            self._rejected.append((bad + self._rows_seen + 1, errors[bad],
+                                   raw[field, np.arange(len(bad))]))
+            keep = errors == 0
+            minutes, ids, locations = minutes[keep], ids[keep], locations[keep]
+        if not (self._dated or dated):
+            self._undated_chunks.append((self._rows_seen, len(errors), keep if len(bad) else None))
+        self._rows_seen += len(errors)
+        
+        codes, categories = pd.factorize(pd.Series(locations, dtype=object), use_na_sentinel=False)
+        remap = np.array([self._code_of.setdefault(location, len(self._code_of))
+                          for location in categories], dtype=np.int32)
+        self._codes.append(remap[codes])
+        self._minutes.append(minutes)
+        self._dated = self._dated or dated
+        self._ids.append(ids)
+    
+    def _reject_undated_chunks(self):
+        """Move the rows of chunks added before the first dated one to the report"""
+        labels = np.array([minutes_to_time(minute) for minute in range(MINUTES_PER_DAY)], dtype=object)
+        for chunk, (first, count, keep) in enumerate(self._undated_chunks):
+            rows = np.arange(first + 1, first + count + 1)
+            if keep is not None:
+                rows = rows[keep]
+            minutes = self._minutes[chunk]
+            self._rejected.append((rows, np.full(len(rows), MISSING_DATE, dtype=np.int8),
+                                   labels[minutes % MINUTES_PER_DAY]))
+            self._minutes[chunk] = minutes[:0]
+            self._codes[chunk] = self._codes[chunk][:0]
+            self._ids[chunk] = self._ids[chunk][:0]
+        self._undated_chunks = []
+    
+    def add_frame(self, df):
+        """Append one DataFrame chunk with location, id, time and optional date columns"""
+        dates = df['date'].to_numpy() if 'date' in df.columns else None
+        self.add_chunk(df['location'].to_numpy(), df['id'].to_numpy(), df['time'].to_numpy(), dates)
+    
+    def build(self):
+        """Concatenate the chunks into a time-ordered ReservationSet"""
+        minutes = np.concatenate(self._minutes) if self._minutes else np.zeros(0, dtype=np.int32)
+        codes = np.concatenate(self._codes) if self._codes else np.zeros(0, dtype=np.int32)
+        ids = np.concatenate(self._ids) if self._ids else np.zeros(0, dtype=np.int64)
+        
+        order = np.argsort(minutes, kind='stable')
+        data = ReservationSet(minutes[order], codes[order], ids[order], list(self._code_of),
+                              self._dated)
+        if self._rejected:
+            rows, errors, values = (np.concatenate(column) for column in zip(*self._rejected))
+            by_row = np.argsort(rows, kind='stable')
+            data.rejected = RejectedRows(rows[by_row], errors[by_row], values[by_row])
+        return data
+
+# File ingestion
+REQUIRED_COLUMNS = ['location', 'id', 'time']
+OPTIONAL_COLUMNS = ['date']
+INGEST_CHUNK_ROWS = 100_000
+FILE_FORMATS = {
+    'csv': 'csv',
+    'parquet': 'parquet',
+    'pq': 'parquet',
+    'arrow': 'arrow',
+    'feather': 'arrow',
+    'ipc': 'arrow',
+    'arrows': 'arrow',
+}
+
+def file_format_from_name(file_name):
+    """Ingestion format for a file name, based on its extension"""
+    extension = file_name.rsplit('.', 1)[-1].lower() if '.' in file_name else ''
+    if extension not in FILE_FORMATS:
+        raise ValueError(f"Unsupported file type: .{extension}")
+    return FILE_FORMATS[extension]
+
+def check_required_columns(columns):
+    """Raise ValueError if any of the location, id and time columns is missing"""
+    missing = [column for column in REQUIRED_COLUMNS if column not in columns]
+    if missing:
+        raise ValueError(f"File must contain columns: {', '.join(REQUIRED_COLUMNS)} "
+                         f"(missing: {', '.join(missing)})")
+
+def _iter_arrow_batches(source):
+    """Record batches and schema of an Arrow IPC file, or of an IPC stream"""
+    import pyarrow as pa
+    
+    if isinstance(source, (str, os.PathLike)):
+        source = pa.memory_map(os.fspath(source))
+    try:
+        reader = pa.ipc.open_file(source)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    except pa.ArrowInvalid:
+        source.seek(0)
+        reader = pa.ipc.open_stream(source)
+        batches = iter(reader)
+    return reader.schema, batches
+
+def iter_reservation_chunks(source, file_format='csv', chunk_rows=INGEST_CHUNK_ROWS):
+    """Yield DataFrame chunks holding only the location, id and time columns"""
+    if file_format == 'csv':
+        reader = pd.read_csv(source,
+                             usecols=lambda column: column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS,
+                             dtype={'location': str, 'id': str, 'time': str, 'date': str},
+                             chunksize=chunk_rows)
+        with reader:
+            for chunk in reader:
+                check_required_columns(chunk.columns)
+                yield chunk
+    
+    elif file_format == 'parquet':
+        import pyarrow.parquet as pq
+        
+        parquet_file = pq.ParquetFile(source)
+        names = parquet_file.schema_arrow.names
+        check_required_columns(names)
+        columns = REQUIRED_COLUMNS + [column for column in OPTIONAL_COLUMNS if column in names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    
+    elif file_format == 'arrow':
+        import pyarrow as pa
+        
+        schema, batches = _iter_arrow_batches(source)
+        check_required_columns(schema.names)
+        columns = REQUIRED_COLUMNS + [column for column in OPTIONAL_COLUMNS if column in schema.names]
+        for batch in batches:
+            table = pa.Table.from_batches([batch]).select(columns)
+            for offset in range(0, table.num_rows, chunk_rows):
+                yield table.slice(offset, chunk_rows).to_pandas()
+    
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+
+def read_reservations(source, file_format='csv', chunk_rows=INGEST_CHUNK_ROWS):
+    """Stream a CSV, Parquet or Arrow IPC file into a ReservationSet chunk by chunk"""
+    builder = ReservationSetBuilder()
+    for chunk in iter_reservation_chunks(source, file_format, chunk_rows):
+        builder.add_frame(chunk)
+    return builder.build()
+
+def parse_pasted_reservations(text):
+    """Parse pasted 'location,id,time[,date]' lines, with or without a header row"""
+    lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+    fields = [field.strip().lower() for field in lines[0].split(',')] if lines else []
+    if set(REQUIRED_COLUMNS) <= set(fields):
+        lines[0] = ','.join(fields)
+    elif lines:
+        header = REQUIRED_COLUMNS + OPTIONAL_COLUMNS[:max(0, lines[0].count(',') - 2)]
+        lines.insert(0, ','.join(header))
+    return read_reservations(io.StringIO('\n'.join(lines)), 'csv')
+
+def sort_reservations_by_time(data):
+    """Sort reservations by time"""
+    return data.take(np.argsort(data.minutes, kind='stable'))
+
+# Default occupancy buffer around each reservation and heatmap slot width
+DEFAULT_BUFFER_MINUTES = 30
+DEFAULT_SLOT_MINUTES = 10
+# Spacing of the dotted heatmap gridlines
+GRIDLINE_MINUTES = 30
+
+class TimeGrid:
+    """Slot grid and occupancy buffer shared by every computation and chart
+    
+    Slots are slot_minutes wide from start_hour to end_hour on every day
+    from start_day through end_day (days since the epoch; undated data
+    lives on day 0). A reservation occupies [time - buffer, time + buffer),
+    where buffer is buffer_minutes unless location_buffers overrides it
+    for the reservation's location. Windows may cross midnight.
+    """
+    
+    def __init__(self, start_hour=8, end_hour=18, slot_minutes=DEFAULT_SLOT_MINUTES,
+                 buffer_minutes=DEFAULT_BUFFER_MINUTES, location_buffers=None,
+                 start_day=0, end_day=None):
+        self.start_hour = start_hour
+        self.end_hour = end_hour
+        self.slot_minutes = slot_minutes
+        self.buffer_minutes = buffer_minutes
+        self.location_buffers = dict(location_buffers or {})
+        self.start_day = start_day
+        self.end_day = start_day if end_day is None else end_day
+        
+        # Daily [start, end) windows in minutes since the epoch and their slots
+        days = np.arange(self.start_day, self.end_day + 1, dtype=np.int64) * MINUTES_PER_DAY
+        self._window_starts = days + self.start_hour * 60
+        self._window_ends = days + self.end_hour * 60
+        day_slots = np.arange(self.start_hour * 60, self.end_hour * 60, self.slot_minutes)
+        self._slot_starts = (days[:, None] + day_slots[None, :]).reshape(-1)
+        
+        # Daily windows that touch (0-24 hours) merge into one span across midnight
+        breaks = np.flatnonzero(self._window_starts[1:] > self._window_ends[:-1]) + 1
+        self._span_starts = self._window_starts[np.r_[0, breaks]]
+        self._span_ends = self._window_ends[np.r_[breaks - 1, len(days) - 1]]
+    
+    @property
+    def start_minute(self):
+        return int(self._window_starts[0])
+    
+    @property
+    def end_minute(self):
+        return int(self._window_ends[-1])
+    
+    @property
+    def n_slots(self):
+        return len(self._slot_starts)
+    
+    @property
+    def multi_day(self):
+        return self.end_day > self.start_day
+    
+    @property
+    def max_buffer(self):
+        return max([self.buffer_minutes, *self.location_buffers.values()])
+    
+    @property
+    def key(self):
+        """Hashable description of the grid, used as a cache key"""
+        return (self.start_hour, self.end_hour, self.slot_minutes, self.buffer_minutes,
+                tuple(sorted(self.location_buffers.items(), key=lambda entry: str(entry[0]))),
+                self.start_day, self.end_day)
+    
+    @property
+    def gridline_step(self):
+        """Number of slots between dotted gridlines"""
+        return max(1, GRIDLINE_MINUTES // self.slot_minutes)
+    
+    def slot_starts(self):
+        """Start minute (since the epoch) of every slot"""
+        return self._slot_starts
+    
+    def slot_label(self, minute):
+        """Axis label of a slot, with the month and day when the grid spans days"""
+        if self.multi_day:
+            return f"{minutes_to_date(minute).strftime('%m-%d')} {minutes_to_time(minute)}"
+        return minutes_to_time(minute)
+    
+    def buffer_label(self):
+        """Short description of the buffer for titles"""
+        label = f"±{self.buffer_minutes} minutes"
+        if self.location_buffers:
+            label += ", per-location overrides"
+        return label
+    
+    def buffers(self, data):
+        """Buffer in minutes for every reservation of a ReservationSet"""
+        if not self.location_buffers:
+            return np.full(len(data), self.buffer_minutes, dtype=np.int64)
+        by_code = np.array([self.location_buffers.get(location, self.buffer_minutes)
+                            for location in data.locations], dtype=np.int64)
+        return by_code[data.codes]
+    
+    def windows(self, data):
+        """Occupancy windows [start, end) in minutes for every reservation"""
+        minutes = data.minutes.astype(np.int64)
+        buffers = self.buffers(data)
+        return minutes - buffers, minutes + buffers
+    
+    def overlaps(self, starts, ends):
+        """Mask of windows that overlap any daily window of the grid"""
+        window = np.searchsorted(self._window_ends, starts, side='right')
+        inside = window < len(self._window_ends)
+        overlaps = np.zeros(len(starts), dtype=bool)
+        overlaps[inside] = self._window_starts[window[inside]] < ends[inside]
+        return overlaps
+    
+    def daily_windows(self):
+        """Start and end minute (since the epoch) of every daily window"""
+        return self._window_starts, self._window_ends
+    
+    def reservation_ranges(self, margin=0):
+        """Merged [lo, hi) ranges of reservation times whose windows come within margin of the grid"""
+        lows = self._window_starts - self.max_buffer - margin + 1
+        highs = self._window_ends + self.max_buffer + margin
+        breaks = np.flatnonzero(lows[1:] > highs[:-1]) + 1
+        return [(int(lows[first]), int(highs[last - 1]))
+                for first, last in zip(np.r_[0, breaks], np.r_[breaks, len(lows)])]
+    
+    def clip(self, starts, ends):
+        """Split windows into non-empty pieces inside the grid, one per span of daily windows
+        
+        Returns (starts, ends, rows, spans): rows indexes the window each
+        piece comes from and spans the merged daily windows it lies in.
+        Pieces are ordered by row, then span, so the part of a window past
+        midnight is kept on the next day.
+        """
+        first = np.searchsorted(self._span_ends, starts, side='right')
+        last = np.searchsorted(self._span_starts, ends, side='left')
+        counts = np.maximum(last - first, 0)
+        rows = np.repeat(np.arange(len(starts)), counts)
+        spans = first[rows] + np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        return (np.maximum(starts[rows], self._span_starts[spans]),
+                np.minimum(ends[rows], self._span_ends[spans]), rows, spans)
+
+def occupancy_bounds(starts, ends, grid):
+    """Map occupancy windows onto [first, last) slot indices of the grid"""
+    # Slot s is covered when start <= s < end: the first slots at or after each bound
+    slot_starts = grid.slot_starts()
+    return (np.searchsorted(slot_starts, np.asarray(starts, dtype=np.int64), side='left'),
+            np.searchsorted(slot_starts, np.asarray(ends, dtype=np.int64), side='left'))
+
+def difference_counts(first, last, group_codes, n_groups, n_positions):
+    """Per-group counts of [first, last) position ranges covering each position"""
+    width = n_positions + 1
+    offsets = np.asarray(group_codes, dtype=np.int64) * width
+    diff = (np.bincount(offsets + first, minlength=n_groups * width)
+            - np.bincount(offsets + last, minlength=n_groups * width))
+    return np.cumsum(diff.reshape(n_groups, width), axis=1)[:, :n_positions]
+
+def occupancy_matrix(starts, ends, group_codes, n_groups, grid):
+    """Per-group slot occupancy counts built from a difference array and prefix sum
+    
+    Costs O(reservations + groups × slots), independent of the window length.
+    """
+    first, last = occupancy_bounds(starts, ends, grid)
+    return difference_counts(first, last, group_codes, n_groups, grid.n_slots)
+
+def occupancy_counts(starts, ends, grid):
+    """Slot occupancy counts for a single group of reservations"""
+    codes = np.zeros(len(starts), dtype=np.int64)
+    return occupancy_matrix(starts, ends, codes, 1, grid)[0]
+
+def group_by_location(data):
+    """Split a ReservationSet by location, largest groups first"""
+    counts = data.location_counts()
+    order = np.argsort(data.codes, kind='stable')  # keeps time order within each location
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    ranked = sorted(np.flatnonzero(counts), key=lambda code: -counts[code])
+    return {data.locations[code]: data.take(order[offsets[code]:offsets[code + 1]])
+            for code in ranked}
+
+def location_occupancy_rows(data, locations, grid, parallel=None):
+    """Occupancy rows for the given locations of a ReservationSet, in that order"""
+    code_of = {location: code for code, location in enumerate(data.locations)}
+    row_of_code = np.full(len(data.locations), -1, dtype=np.int64)
+    for row, location in enumerate(locations):
+        row_of_code[code_of[location]] = row
+    rows = row_of_code[data.codes]
+    selected = rows >= 0
+    starts, ends = grid.windows(data)
+    if parallel is not None and parallel.enabled:
+        return parallel.occupancy_matrix(starts[selected], ends[selected], rows[selected],
+                                         len(locations), grid)
+    return occupancy_matrix(starts[selected], ends[selected], rows[selected], len(locations), grid)
+
+# Location-partitioned execution
+PARALLEL_EXECUTORS = ['thread', 'process']
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _get_pool(executor, workers):
+    """Pool of the given kind and size, shared by every caller in this process"""
+    with _pools_lock:
+        if (executor, workers) not in _pools:
+            if executor == 'process':
+                # spawn: forking a process that runs server threads is unsafe
+                pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+            elif executor == 'thread':
+                pool = ThreadPoolExecutor(workers, thread_name_prefix='occupancy')
+            else:
+                raise ValueError(f"Unknown executor: {executor}")
+            _pools[executor, workers] = pool
+        return _pools[executor, workers]
+
+class SharedArray:
+    """A numpy array backed by a multiprocessing shared memory block"""
+    
+    def __init__(self, shm, shape, dtype):
+        self.shm = shm
+        self.array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    
+    @classmethod
+    def create(cls, array):
+        """Copy an array into a new shared block"""
+        array = np.asarray(array)
+        shared = cls(shared_memory.SharedMemory(create=True, size=max(1, array.nbytes)),
+                     array.shape, array.dtype)
+        shared.array[...] = array
+        return shared
+    
+    @classmethod
+    def attach(cls, spec):
+        """Open a block created by another process from its spec"""
+        name, shape, dtype = spec
+        return cls(shared_memory.SharedMemory(name=name), shape, dtype)
+    
+    @property
+    def spec(self):
+        """Picklable (name, shape, dtype) used to attach from a worker"""
+        return self.shm.name, self.array.shape, self.array.dtype.str
+    
+    def close(self, unlink=False):
+        self.array = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+def _location_partitions(sorted_codes, n_codes, n_parts):
+    """(lo, hi, row_lo, row_hi) code ranges holding about equal numbers of rows"""
+    offsets = np.searchsorted(sorted_codes, np.arange(n_codes + 1))
+    targets = np.linspace(0, len(sorted_codes), n_parts + 1)[1:-1]
+    cuts = np.unique(np.r_[0, np.searchsorted(offsets, targets), n_codes])
+    return [(int(lo), int(hi), int(offsets[lo]), int(offsets[hi]))
+            for lo, hi in zip(cuts[:-1], cuts[1:])]
+
+def _occupancy_partition(inputs, outputs, lo, hi, row_lo, row_hi, grid):
+    starts, ends, codes = (array[row_lo:row_hi] for array in inputs)
+    outputs[0][lo:hi] = occupancy_matrix(starts, ends, codes - lo, hi - lo, grid)
+
+def _peak_partition(inputs, outputs, lo, hi, row_lo, row_hi):
+    starts, ends, codes = (array[row_lo:row_hi] for array in inputs)
+    for output, result in zip(outputs, peak_arrays(starts, ends, codes - lo, hi - lo)):
+        output[lo:hi] = result
+
+def _shared_partition(kernel, input_specs, output_specs, *args):
+    """Run a partition kernel in a worker process on shared input and output arrays"""
+    shared = [SharedArray.attach(spec) for spec in input_specs + output_specs]
+    try:
+        kernel([item.array for item in shared[:len(input_specs)]],
+               [item.array for item in shared[len(input_specs):]], *args)
+    finally:
+        for item in shared:
+            item.close()
+
+class ParallelConfig:
+    """Location-partitioned execution of the per-location kernels
+    
+    Rows are sorted by location code and split into `workers` contiguous
+    code ranges of about equal size; each range is computed by a thread
+    or process and written straight into its slice of the result arrays.
+    Processes receive inputs and write results through shared memory, so
+    nothing but the partition bounds is pickled. Every location is
+    computed by exactly one partition with the serial kernel, so results
+    are identical to the serial path.
+    """
+    
+    def __init__(self, workers=1, executor='thread'):
+        if executor not in PARALLEL_EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor}")
+        self.workers = max(1, int(workers))
+        self.executor = executor
+    
+    @property
+    def enabled(self):
+        return self.workers > 1
+    
+    def run(self, kernel, inputs, outputs, n_codes, *args):
+        """Run kernel(inputs, outputs, lo, hi, row_lo, row_hi, *args) over location partitions
+        
+        inputs are row arrays whose last entry is the location code; outputs
+        are filled in place along their first (location code) axis.
+        """
+        order = np.argsort(inputs[-1], kind='stable')
+        inputs = [np.ascontiguousarray(array[order]) for array in inputs]
+        partitions = _location_partitions(inputs[-1], n_codes, self.workers)
+        pool = _get_pool(self.executor, self.workers)
+        
+        if self.executor == 'thread':
+            futures = [pool.submit(kernel, inputs, outputs, *partition, *args)
+                       for partition in partitions]
+            for future in futures:
+                future.result()
+            return
+        
+        shared = [SharedArray.create(array) for array in inputs + outputs]
+        try:
+            input_specs = [item.spec for item in shared[:len(inputs)]]
+            output_specs = [item.spec for item in shared[len(inputs):]]
+            futures = [pool.submit(_shared_partition, kernel, input_specs, output_specs,
+                                   *partition, *args)
+                       for partition in partitions]
+            for future in futures:
+                future.result()
+            for output, item in zip(outputs, shared[len(inputs):]):
+                output[...] = item.array
+        finally:
+            for item in shared:
+                item.close(unlink=True)
+    
+    def occupancy_matrix(self, starts, ends, group_codes, n_groups, grid):
+        """Partitioned equivalent of occupancy_matrix"""
+        matrix = np.zeros((n_groups, grid.n_slots), dtype=np.int64)
+        self.run(_occupancy_partition, [np.asarray(starts, dtype=np.int64),
+                                        np.asarray(ends, dtype=np.int64),
+                                        np.asarray(group_codes, dtype=np.int64)],
+                 [matrix], n_groups, grid)
+        return matrix
+    
+    def peak_arrays(self, starts, ends, codes, n_codes):
+        """Partitioned equivalent of peak_arrays"""
+        results = [np.zeros(n_codes, dtype=np.int64),
+                   np.full(n_codes, -1, dtype=np.int64),
+                   np.full(n_codes, -1, dtype=np.int64)]
+        self.run(_peak_partition, [np.asarray(starts, dtype=np.int64),
+                                   np.asarray(ends, dtype=np.int64),
+                                   np.asarray(codes, dtype=np.int64)],
+                 results, n_codes)
+        return tuple(results)
+
+def calculate_time_slots(data, grid=None, selected_location=None):
+    """Calculate reservation status by time slots"""
+    grid = grid or TimeGrid()
+    
+    # Only the rows of the selected days (plus buffer) are touched: a contiguous
+    # run in time order
+    data = data.between(grid.start_minute - grid.max_buffer + 1, grid.end_minute + grid.max_buffer)
+    
+    # Filter by location if selected
+    if selected_location and selected_location != "All Locations":
+        data = data.filter_location(selected_location)
+    
+    # Reservations that have any overlap with the daily time ranges
+    starts, ends = grid.windows(data)
+    in_range = grid.overlaps(starts, ends)
+    filtered_data = data.take(in_range)
+    
+    counts = occupancy_counts(starts[in_range], ends[in_range], grid)
+    
+    # Slots carry counts only; use OccupancyIndex to list who occupies a slot
+    time_slots = []
+    for slot_minute, count in zip(grid.slot_starts().tolist(), counts.tolist()):
+        time_slots.append({
+            'time': grid.slot_label(slot_minute),
+            'minutes': slot_minute,
+            'count': count
+        })
+    
+    return time_slots, filtered_data
+
+class OccupancyIndex:
+    """Sorted-array interval index over reservation occupancy windows
+    
+    Answers "which reservations occupy minute t (at location L)" on demand:
+    windows are sorted by start, so candidates are the ones starting within
+    one window length before t, found with two binary searches.
+    """
+    
+    def __init__(self, data, grid=None):
+        self.data = data
+        starts, ends = (grid or TimeGrid()).windows(data)
+        self._max_length = int((ends - starts).max()) if len(data) else 0
+        
+        # One order by start overall, one by (location, start) for per-location queries
+        self._order = np.argsort(starts, kind='stable')
+        self._location_order = np.lexsort((starts, data.codes))
+        self._location_offsets = np.searchsorted(data.codes[self._location_order],
+                                                 np.arange(len(data.locations) + 1))
+        self._starts = starts
+        self._ends = ends
+    
+    def covering_positions(self, minute, location=None):
+        """Positions (in time order) of reservations whose window contains minute"""
+        if location is None:
+            order = self._order
+        elif location in self.data.locations:
+            code = self.data.locations.index(location)
+            order = self._location_order[self._location_offsets[code]:self._location_offsets[code + 1]]
+        else:
+            return np.zeros(0, dtype=np.int64)
+        
+        starts = self._starts[order]
+        lo = np.searchsorted(starts, minute - self._max_length, side='right')
+        hi = np.searchsorted(starts, minute, side='right')
+        candidates = order[lo:hi]
+        return np.sort(candidates[self._ends[candidates] > minute])
+    
+    def covering(self, minute, location=None):
+        """ReservationSet of reservations occupying the given minute"""
+        return self.data.take(self.covering_positions(minute, location))
+
+def peak_arrays(starts, ends, codes, n_codes):
+    """Peak concurrency per location code of clipped [start, end) windows
+    
+    Returns (counts, starts, ends) indexed by code, where [start, end) is
+    the first interval reaching the peak; codes without windows get a
+    count of 0 and -1 bounds.
+    """
+    counts = np.zeros(n_codes, dtype=np.int64)
+    peak_starts = np.full(n_codes, -1, dtype=np.int64)
+    peak_ends = np.full(n_codes, -1, dtype=np.int64)
+    if len(starts) == 0:
+        return counts, peak_starts, peak_ends
+    
+    # Sort events by location, time, then ends before starts at the same minute
+    event_codes = np.concatenate([codes, codes])
+    event_times = np.concatenate([starts, ends])
+    event_deltas = np.repeat(np.array([1, -1], dtype=np.int64), len(starts))
+    order = np.lexsort((event_deltas, event_times, event_codes))
+    event_codes = event_codes[order]
+    event_times = event_times[order]
+    
+    # Every location's events sum to zero, so one running total covers all of them
+    running = np.cumsum(event_deltas[order])
+    group_starts = np.flatnonzero(np.r_[True, event_codes[1:] != event_codes[:-1]])
+    group_peaks = np.maximum.reduceat(running, group_starts)
+    group_of_event = np.repeat(np.arange(len(group_starts)),
+                               np.diff(np.r_[group_starts, len(running)]))
+    
+    # The first event reaching a location's peak opens the peak interval
+    at_peak = np.flatnonzero(running == group_peaks[group_of_event])
+    _, first_at_peak = np.unique(group_of_event[at_peak], return_index=True)
+    peak_events = at_peak[first_at_peak]
+    
+    group_codes = event_codes[group_starts]
+    counts[group_codes] = group_peaks
+    peak_starts[group_codes] = event_times[peak_events]
+    peak_ends[group_codes] = event_times[peak_events + 1]
+    return counts, peak_starts, peak_ends
+
+def calculate_peak_overlaps(data, grid=None, parallel=None):
+    """Exact peak concurrency per location using a sweep over start/end events
+    
+    Returns {location: {'count', 'start', 'end', 'reservations'}} where
+    [start, end) is the first interval (in minutes) at which the peak is
+    reached and 'reservations' is the ReservationSet occupying it. With a
+    ParallelConfig the sweep runs over location partitions in a pool.
+    """
+    empty = data.take(slice(0, 0))
+    peaks = {location: {'count': 0, 'start': None, 'end': None, 'reservations': empty}
+             for location in data.present_locations()}
+    
+    # Occupancy windows clipped to the displayed range, half-open [start, end)
+    grid = grid or TimeGrid()
+    starts, ends, rows, _ = grid.clip(*grid.windows(data))
+    if len(rows) == 0:
+        return peaks
+    
+    codes = data.codes[rows]
+    if parallel is not None and parallel.enabled:
+        counts, peak_starts, peak_ends = parallel.peak_arrays(starts, ends, codes, len(data.locations))
+    else:
+        counts, peak_starts, peak_ends = peak_arrays(starts, ends, codes, len(data.locations))
+    
+    # Reservations involved are the ones covering the start of the peak interval
+    covering = (starts <= peak_starts[codes]) & (ends > peak_starts[codes])
+    involved = rows[covering]
+    involved = involved[np.argsort(codes[covering], kind='stable')]
+    involved_offsets = np.searchsorted(np.sort(codes[covering]), np.arange(len(data.locations) + 1))
+    
+    for code in np.flatnonzero(counts).tolist():
+        rows = involved[involved_offsets[code]:involved_offsets[code + 1]]
+        peaks[data.locations[code]].update(count=int(counts[code]),
+                                           start=int(peak_starts[code]),
+                                           end=int(peak_ends[code]),
+                                           reservations=data.take(rows))
+    
+    return peaks
+
+def calculate_max_overlap_per_location(data, grid=None, parallel=None):
+    """Calculate maximum overlap for each location separately"""
+    peaks = calculate_peak_overlaps(data, grid, parallel)
+    
+    # Return the overall maximum across all locations
+    return max((peak['count'] for peak in peaks.values()), default=0)
+
+# Busiest-slot ranking defaults: slots shown and the occupancy worth flagging
+DEFAULT_TOP_SLOTS = 5
+DEFAULT_HOTSPOT_THRESHOLD = 3
+
+def busiest_slots(data, grid=None, k=DEFAULT_TOP_SLOTS, threshold=DEFAULT_HOTSPOT_THRESHOLD,
+                  parallel=None):
+    """The k (location, slot) cells with the highest occupancy at or above threshold
+    
+    Ranks the location × slot occupancy matrix with a partial sort, so only
+    the k winners are fully ordered: by count, then time, then location.
+    Returns ([{'location', 'minutes', 'time', 'count'}], number of cells at
+    or above threshold); use OccupancyIndex to list who occupies a cell.
+    """
+    grid = grid or TimeGrid()
+    locations = sorted(data.present_locations())
+    matrix = location_occupancy_rows(data, locations, grid, parallel)
+    
+    # Cells flattened slot-major, so a lower index is an earlier slot, then location
+    counts = matrix.T.ravel()
+    cells = np.flatnonzero(counts >= threshold)
+    n_matching = len(cells)
+    keys = -counts[cells] * counts.size + cells
+    if len(cells) > k:
+        keep = np.argpartition(keys, k - 1)[:k] if k > 0 else np.zeros(0, dtype=np.int64)
+        cells, keys = cells[keep], keys[keep]
+    cells = cells[np.argsort(keys)]
+    
+    slot_starts = grid.slot_starts()
+    slots = []
+    for cell in cells.tolist():
+        slot, row = divmod(cell, len(locations))
+        minute = int(slot_starts[slot])
+        slots.append({
+            'location': locations[row],
+            'minutes': minute,
+            'time': grid.slot_label(minute),
+            'count': int(counts[cell])
+        })
+    return slots, n_matching
+
+# Concurrency above which a location is over capacity, unless overridden per location
+DEFAULT_CAPACITY = 2
+
+def conflict_arrays(starts, ends, codes, capacities):
+    """Over-capacity intervals of clipped [start, end) windows from one sweep over sorted events
+    
+    Windows must be sorted by location code with starts and ends each
+    non-decreasing within a location, as the windows of time-ordered rows
+    are; capacities is indexed by location code. Returns (codes, starts,
+    ends, peaks) of the maximal intervals in which a location's
+    concurrency exceeds its capacity, ordered by location code and start;
+    peaks is the highest concurrency reached inside each interval.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if len(starts) == 0:
+        return empty, empty, empty, empty
+    
+    # Merge the sorted starts and ends into one (location, time) event order with ends
+    # first at equal times, by counting the other kind's events that precede each one
+    base = int(starts.min())
+    span = int(ends.max()) - base + 1
+    start_keys = codes * span + (starts - base)
+    end_keys = codes * span + (ends - base)
+    n = len(starts)
+    start_events = np.arange(n) + np.searchsorted(end_keys, start_keys, side='right')
+    end_events = np.arange(n) + np.searchsorted(start_keys, end_keys, side='left')
+    event_codes = np.empty(2 * n, dtype=np.int64)
+    event_times = np.empty(2 * n, dtype=np.int64)
+    event_deltas = np.empty(2 * n, dtype=np.int64)
+    event_codes[start_events], event_codes[end_events] = codes, codes
+    event_times[start_events], event_times[end_events] = starts, ends
+    event_deltas[start_events], event_deltas[end_events] = 1, -1
+    running = np.cumsum(event_deltas)
+    
+    # Event i opens [time i, time i + 1) at concurrency running[i]; a location's last
+    # event brings it back to zero, so an over-capacity event is never the last one
+    over = np.flatnonzero(running > np.asarray(capacities, dtype=np.int64)[event_codes])
+    if len(over) == 0:
+        return empty, empty, empty, empty
+    breaks = np.flatnonzero(np.diff(over) > 1) + 1
+    run_firsts = over[np.r_[0, breaks]]
+    run_lasts = over[np.r_[breaks - 1, len(over) - 1]]
+    run_codes = event_codes[run_firsts]
+    run_starts = event_times[run_firsts]
+    run_ends = event_times[run_lasts + 1]
+    run_peaks = np.maximum.reduceat(running[over], np.r_[0, breaks])
+    
+    # Runs split only by a same-minute end and start are one conflict
+    merged = np.flatnonzero(np.r_[True, (run_codes[1:] != run_codes[:-1])
+                                  | (run_starts[1:] != run_ends[:-1])])
+    conflict_codes = run_codes[merged]
+    conflict_starts = run_starts[merged]
+    conflict_ends = np.maximum.reduceat(run_ends, merged)
+    conflict_peaks = np.maximum.reduceat(run_peaks, merged)
+    keep = conflict_ends > conflict_starts
+    return conflict_codes[keep], conflict_starts[keep], conflict_ends[keep], conflict_peaks[keep]
+
+class ConflictReport:
+    """Intervals where a location exceeds its capacity, with the reservations involved
+    
+    Conflicts are ordered by start, then location. Every reservation whose
+    window overlaps a conflict interval at that location is listed for it.
+    """
+    
+    def __init__(self, data, codes, starts, ends, peaks, capacities, positions, offsets):
+        self.data = data
+        self.codes = codes
+        self.starts = starts
+        self.ends = ends
+        self.peaks = peaks
+        self.capacities = capacities
+        self._positions = positions
+        self._offsets = offsets
+    
+    def __len__(self):
+        return len(self.codes)
+    
+    def reservations(self, i):
+        """ReservationSet of the reservations involved in conflict i, in time order"""
+        return self.data.take(self._positions[self._offsets[i]:self._offsets[i + 1]])
+    
+    def frame(self):
+        """One row per conflict, with the involved reservation IDs, for display or export"""
+        ids = self.data.ids[self._positions].tolist()
+        offsets = self._offsets.tolist()
+        return pd.DataFrame({
+            'Location': [self.data.locations[code] for code in self.codes.tolist()],
+            'Start': [format_minutes(minute, self.data.dated) for minute in self.starts.tolist()],
+            'End': [format_minutes(minute, self.data.dated) for minute in self.ends.tolist()],
+            'Minutes': self.ends - self.starts,
+            'Peak Concurrency': self.peaks,
+            'Capacity': self.capacities[self.codes],
+            'Reservations': np.diff(self._offsets),
+            'Reservation IDs': [' '.join(map(str, ids[offsets[i]:offsets[i + 1]]))
+                                for i in range(len(self))]
+        })
+
+def detect_conflicts(data, grid=None, capacity=DEFAULT_CAPACITY, location_capacities=None):
+    """Every interval where a location's concurrency exceeds its capacity, as a ConflictReport
+    
+    capacity applies to every location unless location_capacities
+    overrides it. Windows are clipped to the grid as for peak overlaps.
+    """
+    grid = grid or TimeGrid()
+    location_capacities = location_capacities or {}
+    capacities = np.array([location_capacities.get(location, capacity)
+                           for location in data.locations], dtype=np.int64)
+    
+    # Rows are time-ordered and a location has one buffer, so sorting pieces by location and
+    # span leaves both window starts and ends sorted within each location
+    starts, ends, rows, spans = grid.clip(*grid.windows(data))
+    codes = data.codes[rows].astype(np.int64)
+    by_piece = np.argsort(codes * (int(spans.max()) + 1 if len(spans) else 1) + spans, kind='stable')
+    starts, ends, codes = starts[by_piece], ends[by_piece], codes[by_piece]
+    by_location = rows[by_piece]
+    conflict_codes, conflict_starts, conflict_ends, peaks = conflict_arrays(starts, ends, codes,
+                                                                            capacities)
+    order = np.lexsort((conflict_codes, conflict_starts))
+    conflict_codes, conflict_starts, conflict_ends, peaks = (
+        conflict_codes[order], conflict_starts[order], conflict_ends[order], peaks[order])
+    
+    # Candidates of a conflict start at most one window length before it and before
+    # its end: a run of rows in (location, start) order, filtered on their ends
+    base = int(starts.min()) if len(starts) else 0
+    span = int(ends.max()) - base + 1 if len(ends) else 1
+    keys = codes * span + (starts - base)
+    max_length = int((ends - starts).max()) if len(starts) else 0
+    lo = np.searchsorted(keys, conflict_codes * span
+                         + np.maximum(conflict_starts - max_length + 1 - base, 0))
+    hi = np.searchsorted(keys, conflict_codes * span + (conflict_ends - base))
+    
+    lengths = hi - lo
+    conflict_of = np.repeat(np.arange(len(lo)), lengths)
+    candidates = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths - lo, lengths)
+    involved = ends[candidates] > conflict_starts[conflict_of]
+    offsets = np.r_[0, np.cumsum(np.bincount(conflict_of[involved], minlength=len(lo)))]
+    
+    # Positions in data; a location's candidates are already in time order
+    positions = by_location[candidates[involved]]
+    return ConflictReport(data, conflict_codes, conflict_starts, conflict_ends, peaks, capacities,
+                          positions, offsets)
+
+class AvailabilityIndex:
+    """Per-location minute occupancy of the grid's days, for free-window searches
+    
+    Occupancy is computed once for every minute of the daily windows
+    widened by the largest buffer, one row per location. Queries read a
+    location's row through a cached prefix count of its blocked minutes
+    (occupancy at or above capacity) and never revisit the reservations,
+    so many searches against one index stay cheap.
+    """
+    
+    def __init__(self, data, grid=None):
+        self.grid = grid = grid or TimeGrid()
+        self.dated = data.dated
+        self.locations = data.locations
+        window_starts, window_ends = grid.daily_windows()
+        
+        # A new reservation inside a daily window reaches at most one buffer outside it,
+        # where existing windows reaching one more buffer can still overlap it
+        widen = grid.max_buffer
+        self.minutes = np.unique(np.concatenate([
+            np.arange(start - widen, end + widen)
+            for start, end in zip(window_starts.tolist(), window_ends.tolist())]))
+        data = data.between(grid.start_minute - 2 * widen + 1, grid.end_minute + 2 * widen)
+        starts, ends = grid.windows(data)
+        self.occupancy = difference_counts(np.searchsorted(self.minutes, starts),
+                                           np.searchsorted(self.minutes, ends),
+                                           data.codes, len(self.locations),
+                                           len(self.minutes)).astype(np.int32)
+        
+        # Minutes a reservation may start at, with the end of their daily window
+        open_minutes = [np.arange(start, end) for start, end in zip(window_starts.tolist(),
+                                                                    window_ends.tolist())]
+        self._open = np.concatenate(open_minutes)
+        self._open_ends = np.repeat(window_ends, [len(minutes) for minutes in open_minutes])
+        self._blocked = {}
+    
+    def _blocked_prefix(self, location, capacity):
+        """Running count of minutes at which location has no room left under capacity"""
+        key = (location, capacity)
+        if key not in self._blocked:
+            if location in self.locations:
+                occupancy = self.occupancy[self.locations.index(location)]
+            else:
+                occupancy = np.zeros(len(self.minutes), dtype=np.int32)
+            self._blocked[key] = np.r_[0, np.cumsum(occupancy >= capacity)]
+        return self._blocked[key]
+    
+    def find(self, location, duration=0, capacity=DEFAULT_CAPACITY, earliest=None, n=5):
+        """First n windows at location where a new reservation of duration minutes fits
+        
+        Returns (earliest start, latest start) minute pairs: any start in
+        between keeps the location within capacity over the reservation
+        plus its buffer on both sides, and ends inside the daily window.
+        """
+        buffer = self.grid.location_buffers.get(location, self.grid.buffer_minutes)
+        blocked = self._blocked_prefix(location, capacity)
+        
+        first = 0 if earliest is None else np.searchsorted(self._open, earliest)
+        candidates = self._open[first:]
+        candidates = candidates[candidates + duration <= self._open_ends[first:]]
+        lo = np.searchsorted(self.minutes, candidates - buffer)
+        hi = np.searchsorted(self.minutes, candidates + duration + buffer)
+        candidates = candidates[blocked[hi] == blocked[lo]]
+        if len(candidates) == 0:
+            return []
+        
+        breaks = np.flatnonzero(np.diff(candidates) != 1) + 1
+        firsts = candidates[np.r_[0, breaks]][:n]
+        lasts = candidates[np.r_[breaks - 1, len(candidates) - 1]][:n]
+        return list(zip(firsts.tolist(), lasts.tolist()))
+    
+    def find_many(self, requests):
+        """Answer a batch of find() keyword-argument dicts, in order"""
+        return [self.find(**request) for request in requests]
+
+# Locations whose busy bits are built at a time, bounding the transient count matrix
+BITSET_CHUNK_LOCATIONS = 64
+# Set bits per byte value, for popcounts of packed bitsets
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+LOCATION_SET_CONDITIONS = ['all busy', 'any busy', 'all free', 'any free']
+
+class OccupancyBitsets:
+    """Busy minutes per location as packed bitsets, eight minutes to a byte
+    
+    Bit i of a location's row is set when any of its reservation windows
+    covers the i-th minute of the grid's daily windows. Cross-location
+    questions are byte-wise AND/OR over rows and popcounts through a
+    lookup table, touching locations × minutes / 8 bytes.
+    """
+    
+    def __init__(self, data, grid=None):
+        self.grid = grid = grid or TimeGrid()
+        self.dated = data.dated
+        self.locations = data.locations
+        window_starts, window_ends = grid.daily_windows()
+        self.minutes = np.concatenate([np.arange(start, end) for start, end
+                                       in zip(window_starts.tolist(), window_ends.tolist())])
+        # Padding bits past the last minute must stay clear after a negation
+        self._valid = np.packbits(np.ones(len(self.minutes), dtype=bool))
+        
+        data = data.between(grid.start_minute - grid.max_buffer + 1, grid.end_minute + grid.max_buffer)
+        starts, ends = grid.windows(data)
+        first = np.searchsorted(self.minutes, starts)
+        last = np.searchsorted(self.minutes, ends)
+        order = np.argsort(data.codes, kind='stable')
+        sorted_codes = data.codes[order]
+        
+        self.bits = np.zeros((len(self.locations), len(self._valid)), dtype=np.uint8)
+        for lo in range(0, len(self.locations), BITSET_CHUNK_LOCATIONS):
+            hi = min(lo + BITSET_CHUNK_LOCATIONS, len(self.locations))
+            rows = order[np.searchsorted(sorted_codes, lo):np.searchsorted(sorted_codes, hi)]
+            counts = difference_counts(first[rows], last[rows], data.codes[rows] - lo, hi - lo,
+                                       len(self.minutes))
+            self.bits[lo:hi] = np.packbits(counts > 0, axis=1)
+    
+    def rows(self, locations):
+        """Packed busy rows of the given locations; unknown locations are never busy"""
+        rows = np.zeros((len(locations), len(self._valid)), dtype=np.uint8)
+        for i, location in enumerate(locations):
+            if location in self.locations:
+                rows[i] = self.bits[self.locations.index(location)]
+        return rows
+    
+    def combine(self, locations, condition='all busy'):
+        """Packed minutes at which the condition holds across the given locations"""
+        if not locations:
+            raise ValueError("Select at least one location")
+        if condition not in LOCATION_SET_CONDITIONS:
+            raise ValueError(f"Unknown condition: {condition}")
+        rows = self.rows(locations)
+        if condition == 'all busy':
+            return np.bitwise_and.reduce(rows, axis=0)
+        if condition == 'any busy':
+            return np.bitwise_or.reduce(rows, axis=0)
+        if condition == 'all free':
+            return ~np.bitwise_or.reduce(rows, axis=0) & self._valid
+        return ~np.bitwise_and.reduce(rows, axis=0) & self._valid
+    
+    @staticmethod
+    def popcount(packed):
+        """Number of set bits along the last axis"""
+        return _POPCOUNT[packed].sum(axis=-1, dtype=np.int64)
+    
+    def busy_minutes(self):
+        """Busy minutes per location code"""
+        return self.popcount(self.bits)
+    
+    def intervals(self, packed):
+        """Set bits as [start, end) minute intervals, merged where minutes are consecutive"""
+        minutes = self.minutes[np.unpackbits(packed, count=len(self.minutes)).astype(bool)]
+        if len(minutes) == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(minutes) != 1) + 1
+        return list(zip(minutes[np.r_[0, breaks]].tolist(),
+                        (minutes[np.r_[breaks - 1, len(minutes) - 1]] + 1).tolist()))
+
+class LiveReservationStore:
+    """Session-persistent reservation store with incremental occupancy
+    
+    Wraps a plain state dict (kept in st.session_state) so edits survive
+    reruns. Once synced to a TimeGrid it keeps minute-level occupancy per
+    location, a histogram of those counts, each location's peak and
+    total, and a histogram of peaks. Adding or removing a reservation
+    updates them in O(window minutes): a peak moves by at most one per
+    change, so the histograms tell where it went without a rescan.
+    """
+    
+    def __init__(self, state):
+        self.state = state
+        for name in ('minutes', 'codes', 'ids', 'locations'):
+            state.setdefault(name, [])
+        state.setdefault('code_of', {})
+        state.setdefault('position_of_id', {})
+        state.setdefault('dated', False)
+        state.setdefault('grid_key', None)
+    
+    def __len__(self):
+        return len(self.state['ids'])
+    
+    @property
+    def initialized(self):
+        return self.state.get('initialized', False)
+    
+    def reservation_set(self):
+        """Current reservations as a time-ordered ReservationSet"""
+        state = self.state
+        minutes = np.asarray(state['minutes'], dtype=np.int32)
+        order = np.argsort(minutes, kind='stable')
+        return ReservationSet(minutes[order], np.asarray(state['codes'], dtype=np.int32)[order],
+                              np.asarray(state['ids'], dtype=np.int64)[order],
+                              state['locations'], state['dated'])
+    
+    # Edits
+    def add(self, location, reservation_id, minute):
+        """Add one reservation; returns False if the id already exists"""
+        state = self.state
+        reservation_id = int(reservation_id)
+        if reservation_id in state['position_of_id']:
+            return False
+        
+        if location not in state['code_of']:
+            state['code_of'][location] = len(state['locations'])
+            state['locations'].append(location)
+            self._add_location_row()
+        code = state['code_of'][location]
+        
+        state['position_of_id'][reservation_id] = len(state['ids'])
+        state['minutes'].append(int(minute))
+        state['codes'].append(code)
+        state['ids'].append(reservation_id)
+        self._apply(code, int(minute), 1)
+        return True
+    
+    def add_set(self, data):
+        """Add every reservation of a ReservationSet; returns how many were new"""
+        self.state['initialized'] = True
+        self.state['dated'] = self.state['dated'] or data.dated
+        added = 0
+        for code, reservation_id, minute in zip(data.codes.tolist(), data.ids.tolist(),
+                                                data.minutes.tolist()):
+            added += self.add(data.locations[code], reservation_id, minute)
+        return added
+    
+    def remove(self, reservation_id):
+        """Remove a reservation by id; returns False if it does not exist"""
+        state = self.state
+        position = state['position_of_id'].pop(int(reservation_id), None)
+        if position is None:
+            return False
+        code = state['codes'][position]
+        minute = state['minutes'][position]
+        
+        # Move the last row into the freed position
+        for name in ('minutes', 'codes', 'ids'):
+            column = state[name]
+            column[position] = column[-1]
+            column.pop()
+        if position < len(state['ids']):
+            state['position_of_id'][state['ids'][position]] = position
+        self._apply(code, minute, -1)
+        return True
+    
+    # Occupancy
+    def sync(self, grid):
+        """Track occupancy on this grid, rebuilding only when the grid changed"""
+        if self.state['grid_key'] != grid.key:
+            self._rebuild(grid)
+    
+    def _minute_grid(self):
+        """Minute-resolution copy of the synced grid"""
+        key = self.state['grid_key']
+        if getattr(self, '_minute_grid_key', None) != key:
+            start_hour, end_hour, _, buffer_minutes, location_buffers, start_day, end_day = key
+            self._minute_grid_cache = TimeGrid(start_hour, end_hour, 1, buffer_minutes,
+                                               dict(location_buffers), start_day, end_day)
+            self._minute_grid_key = key
+        return self._minute_grid_cache
+    
+    def _rebuild(self, grid):
+        state = self.state
+        state['grid_key'] = grid.key
+        minute_grid = self._minute_grid()
+        data = self.reservation_set()
+        starts, ends = minute_grid.windows(data)
+        n_locations = len(state['locations'])
+        counts = occupancy_matrix(starts, ends, data.codes, n_locations, minute_grid).astype(np.int32)
+        
+        # Histogram of cell counts per location, padded so any count can grow by one
+        height = int(counts.max(initial=0)) + 2
+        offsets = np.arange(n_locations, dtype=np.int64)[:, None] * height
+        histogram = np.bincount((counts + offsets).reshape(-1), minlength=n_locations * height)
+        peaks = counts.max(axis=1, initial=0)
+        first, last = occupancy_bounds(starts, ends, minute_grid)
+        
+        state['counts'] = counts
+        state['histogram'] = histogram.reshape(n_locations, height)
+        state['peaks'] = peaks.astype(np.int64)
+        state['peak_histogram'] = np.bincount(peaks, minlength=height)
+        state['totals'] = np.bincount(data.codes[first < last], minlength=n_locations)
+        state['max_peak'] = int(peaks.max(initial=0))
+    
+    def _add_location_row(self):
+        state = self.state
+        if state['grid_key'] is None:
+            return
+        n_cells = state['counts'].shape[1]
+        state['counts'] = np.vstack([state['counts'], np.zeros((1, n_cells), dtype=np.int32)])
+        new_row = np.zeros((1, state['histogram'].shape[1]), dtype=np.int64)
+        new_row[0, 0] = n_cells
+        state['histogram'] = np.vstack([state['histogram'], new_row])
+        state['peaks'] = np.append(state['peaks'], 0)
+        state['peak_histogram'][0] += 1
+        state['totals'] = np.append(state['totals'], 0)
+    
+    def _apply(self, code, minute, delta):
+        """Add (delta=1) or remove (delta=-1) one window from the synced occupancy"""
+        state = self.state
+        if state['grid_key'] is None:
+            return
+        minute_grid = self._minute_grid()
+        buffer = minute_grid.location_buffers.get(state['locations'][code], minute_grid.buffer_minutes)
+        first, last = occupancy_bounds([minute - buffer], [minute + buffer], minute_grid)
+        first, last = int(first[0]), int(last[0])
+        if first >= last:
+            return
+        
+        # Grow the histograms when a count could pass their height
+        height = state['histogram'].shape[1]
+        if state['peaks'][code] + 2 > height:
+            state['histogram'] = np.pad(state['histogram'], ((0, 0), (0, height)))
+            state['peak_histogram'] = np.pad(state['peak_histogram'], (0, height))
+            height *= 2
+        
+        cells = state['counts'][code, first:last]
+        state['histogram'][code] -= np.bincount(cells, minlength=height)
+        cells += delta
+        state['histogram'][code] += np.bincount(cells, minlength=height)
+        state['totals'][code] += delta
+        
+        old_peak = int(state['peaks'][code])
+        new_peak = old_peak
+        if delta > 0 and state['histogram'][code, old_peak + 1] > 0:
+            new_peak = old_peak + 1
+        elif delta < 0 and old_peak > 0 and state['histogram'][code, old_peak] == 0:
+            new_peak = old_peak - 1
+        if new_peak != old_peak:
+            state['peaks'][code] = new_peak
+            state['peak_histogram'][old_peak] -= 1
+            state['peak_histogram'][new_peak] += 1
+            if new_peak > state['max_peak']:
+                state['max_peak'] = new_peak
+            elif old_peak == state['max_peak'] and state['peak_histogram'][old_peak] == 0:
+                state['max_peak'] = new_peak
+    
+    # Metrics of the synced grid
+    def _code(self, location):
+        return self.state['code_of'].get(location)
+    
+    def total(self, location=None):
+        """Reservations overlapping the grid, at one location or overall"""
+        if location is None:
+            return int(self.state['totals'].sum())
+        code = self._code(location)
+        return 0 if code is None else int(self.state['totals'][code])
+    
+    def active_locations(self, location=None):
+        """Number of locations with reservations overlapping the grid"""
+        if location is None:
+            return int(np.count_nonzero(self.state['totals']))
+        return int(self.total(location) > 0)
+    
+    def peak(self, location=None):
+        """Peak concurrency at one location, or the maximum over all locations"""
+        if location is None:
+            return self.state['max_peak']
+        code = self._code(location)
+        return 0 if code is None else int(self.state['peaks'][code])
+    
+    def peak_location(self):
+        """A location whose peak equals the overall maximum"""
+        if not self.state['locations']:
+            return None
+        return self.state['locations'][int(np.argmax(self.state['peaks']))]
+    
+    def peak_interval(self, location):
+        """First [start, end) minute interval at which a location reaches its peak
+        
+        As in calculate_peak_overlaps, the interval ends at the next window
+        start or end, so the same reservations occupy all of it.
+        """
+        code = self._code(location)
+        peak = self.peak(location)
+        if code is None or peak == 0:
+            return None
+        minute_grid = self._minute_grid()
+        start = int(minute_grid.slot_starts()[np.argmax(self.state['counts'][code] == peak)])
+        data = self.reservation_set().filter_location(location)
+        starts, ends, _, _ = minute_grid.clip(*minute_grid.windows(data))
+        events = np.concatenate([starts, ends])
+        return start, int(events[events > start].min())
+
+# Reservation list paging
+RESERVATION_SORT_KEYS = ["Location", "Time", "ID"]
+
+
+def search_reservations(data, query):
+    """Mask of reservations whose location, id or time matches a search string"""
+    query = query.strip().lower()
+    if not query:
+        return np.ones(len(data), dtype=bool)
+    
+    # Locations and times are matched once per distinct value
+    location_match = np.array([query in str(location).lower() for location in data.locations],
+                              dtype=bool)
+    mask = location_match[data.codes]
+    unique_minutes, inverse = np.unique(data.minutes % MINUTES_PER_DAY, return_inverse=True)
+    time_match = np.array([minutes_to_time(int(minute)).startswith(query)
+                           for minute in unique_minutes], dtype=bool)
+    mask |= time_match[inverse.reshape(-1)]
+    if data.dated:
+        unique_days, inverse = np.unique(data.minutes // MINUTES_PER_DAY, return_inverse=True)
+        date_match = np.array([minutes_to_date(int(day) * MINUTES_PER_DAY).isoformat().startswith(query)
+                               for day in unique_days], dtype=bool)
+        mask |= date_match[inverse.reshape(-1)]
+    if query.isdigit():
+        mask |= pd.Series(data.ids).astype(str).str.contains(query, regex=False).to_numpy()
+    return mask
+
+def sort_reservations(data, sort_by="Location", descending=False):
+    """Row order for the reservation list (location ties break by time, and vice versa)"""
+    location_rank = np.argsort(np.argsort(np.array(data.locations, dtype=str)))
+    if sort_by == "ID":
+        order = np.argsort(data.ids, kind='stable')
+    elif sort_by == "Time":
+        order = np.lexsort((location_rank[data.codes], data.minutes))
+    else:
+        order = np.lexsort((data.minutes, location_rank[data.codes]))
+    return order[::-1] if descending else order
+
+def reservation_page_frame(data, rows, grid):
+    """Table of the given rows with their occupancy window"""
+    page = data.take(rows)
+    starts, ends = grid.windows(page)
+    frame = pd.DataFrame({
+        'Location': [page.locations[code] for code in page.codes],
+        'ID': page.ids,
+        'Time': [minutes_to_time(minute) for minute in page.minutes.tolist()],
+        'Occupancy': [f"{minutes_to_time(start)} ~ {minutes_to_time(end)}"
+                      for start, end in zip(starts.tolist(), ends.tolist())]
+    })
+    if data.dated:
+        frame.insert(2, 'Date', [minutes_to_date(minute).isoformat() for minute in page.minutes.tolist()])
+    return frame
+
+# SQLite storage
+DATABASE_EXTENSIONS = ('db', 'sqlite', 'sqlite3')
+DATABASE_INSERT_ROWS = 100_000
+# Grids spanning more days than this are read as one range instead of one per day
+DATABASE_MAX_RANGES = 256
+
+_DATABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS locations (
+    code INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS reservations (
+    id INTEGER NOT NULL,
+    location INTEGER NOT NULL REFERENCES locations (code),
+    start_minute INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reservations_location_start ON reservations (location, start_minute);
+CREATE INDEX IF NOT EXISTS reservations_start ON reservations (start_minute);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+# Columns an existing database must have to be opened read-only
+_DATABASE_COLUMNS = {
+    'locations': {'code', 'name'},
+    'reservations': {'id', 'location', 'start_minute'},
+    'settings': {'key', 'value'},
+}
+
+def is_database_file(file_name):
+    """Whether a file name has a SQLite database extension"""
+    return '.' in file_name and file_name.rsplit('.', 1)[-1].lower() in DATABASE_EXTENSIONS
+
+class ReservationDatabase:
+    """Reservations persisted in a local SQLite file
+    
+    Rows are indexed on (location, start_minute) and on start_minute, so
+    a view's location and time-range filters and the per-location totals
+    run as indexed queries, and only the rows a view can touch are loaded
+    into a ReservationSet. Every call opens its own connection, so an
+    instance can be shared between threads. With create=False the file is
+    opened read-only and must already hold the reservation tables.
+    """
+    
+    def __init__(self, path, create=True):
+        if not create and not os.path.exists(path):
+            raise FileNotFoundError(f"No such database: {path}")
+        self.path = path
+        self.read_only = not create
+        with self._connect() as conn:
+            if create:
+                conn.executescript(_DATABASE_SCHEMA)
+            else:
+                self._check_schema(conn)
+    
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success and rolls back on error"""
+        if self.read_only:
+            conn = sqlite3.connect(f"{pathlib.Path(self.path).resolve().as_uri()}?mode=ro", uri=True)
+        else:
+            conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def _check_schema(self, conn):
+        """Raise ValueError unless every reservation table has the expected columns"""
+        for table, columns in _DATABASE_COLUMNS.items():
+            found = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if not columns <= found:
+                raise ValueError(f"Not a reservations database: {self.path}")
+    
+    @staticmethod
+    def _dated(conn):
+        row = conn.execute("SELECT value FROM settings WHERE key = 'dated'").fetchone()
+        return row is not None and row[0] == '1'
+    
+    @staticmethod
+    def _location_code(conn, location):
+        row = conn.execute("SELECT code FROM locations WHERE name = ?", (location,)).fetchone()
+        return None if row is None else row[0]
+    
+    @property
+    def dated(self):
+        with self._connect() as conn:
+            return self._dated(conn)
+    
+    def add(self, data, replace=False):
+        """Store a ReservationSet, after the existing rows or (replace=True) instead of them"""
+        with self._connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM reservations")
+                conn.execute("DELETE FROM locations")
+            dated = data.dated or (not replace and self._dated(conn))
+            
+            # Stored codes stay 0..n-1 so they index the category list directly
+            code_of = dict(conn.execute("SELECT name, code FROM locations"))
+            new_locations = [location for location in data.locations if location not in code_of]
+            for location in new_locations:
+                code_of[location] = len(code_of)
+            conn.executemany("INSERT INTO locations (code, name) VALUES (?, ?)",
+                             [(code_of[location], location) for location in new_locations])
+            
+            remap = np.array([code_of[location] for location in data.locations], dtype=np.int64)
+            for offset in range(0, len(data), DATABASE_INSERT_ROWS):
+                chunk = slice(offset, offset + DATABASE_INSERT_ROWS)
+                conn.executemany("INSERT INTO reservations (id, location, start_minute) VALUES (?, ?, ?)",
+                                 zip(data.ids[chunk].tolist(), remap[data.codes[chunk]].tolist(),
+                                     data.minutes[chunk].tolist()))
+            conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('dated', ?)",
+                         ('1' if dated else '0',))
+    
+    def day_range(self):
+        """First and last day with reservations, or None for an empty database"""
+        with self._connect() as conn:
+            first, last = conn.execute("SELECT MIN(start_minute), MAX(start_minute) "
+                                       "FROM reservations").fetchone()
+        if first is None:
+            return None
+        return first // MINUTES_PER_DAY, last // MINUTES_PER_DAY
+    
+    def location_counts(self):
+        """Number of reservations per location that has any, by location name"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT locations.name, COUNT(*) FROM reservations "
+                                "JOIN locations ON locations.code = reservations.location "
+                                "GROUP BY reservations.location ORDER BY reservations.location")
+            return dict(rows.fetchall())
+    
+    def query(self, ranges=None, location=None):
+        """Time-ordered rows with times in any of the sorted [lo, hi) ranges, at one location or all"""
+        with self._connect() as conn:
+            locations = [name for (name,) in conn.execute("SELECT name FROM locations ORDER BY code")]
+            dated = self._dated(conn)
+            
+            conditions, params = [], []
+            if location is not None:
+                conditions.append("location = ?")
+                params.append(self._location_code(conn, location))
+            # One indexed range scan per range; rowid keeps ties in insertion order
+            rows = []
+            for lo, hi in ranges if ranges is not None else [(None, None)]:
+                where = list(conditions)
+                if lo is not None:
+                    where.append("start_minute >= ? AND start_minute < ?")
+                sql = "SELECT start_minute, location, id FROM reservations"
+                if where:
+                    sql += " WHERE " + " AND ".join(where)
+                sql += " ORDER BY start_minute, rowid"
+                rows.extend(conn.execute(sql, params + ([lo, hi] if lo is not None else [])).fetchall())
+        
+        columns = np.array(rows, dtype=np.int64).reshape(-1, 3)
+        return ReservationSet(columns[:, 0], columns[:, 1], columns[:, 2], locations, dated)
+    
+    def load_view(self, grid, location=None, margin=0):
+        """Rows whose windows come within margin minutes of the grid, at one location or all"""
+        ranges = grid.reservation_ranges(margin)
+        if len(ranges) > DATABASE_MAX_RANGES:
+            ranges = [(ranges[0][0], ranges[-1][1])]
+        return self.query(ranges, location)
+
+# Occupancy snapshots
+SNAPSHOT_VERSION = 2
+SNAPSHOT_SUFFIX = '.occupancy'
+SNAPSHOT_ARRAYS = ('occupancy', 'location_counts', 'peak_counts', 'peak_starts', 'peak_ends')
+HASH_CHUNK_BYTES = 1 << 20
+
+def file_content_hash(path):
+    """Digest of a file's bytes, read in chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_path(source_path):
+    """Directory holding the occupancy snapshot of a source file"""
+    return source_path + SNAPSHOT_SUFFIX
+
+class OccupancySnapshot:
+    """Per-location occupancy, reservation counts and peaks of one dataset and grid
+    
+    Covers the reservations whose windows overlap the grid, one row per
+    location in sorted order. Saved as .npy files plus a meta.json that
+    records the snapshot version, the source content hash and the grid
+    key; load() memory-maps the arrays and returns None when any of the
+    three differs, so edited sources and changed buffer or slot settings
+    are recomputed.
+    """
+    
+    def __init__(self, locations, dated, occupancy, location_counts, peak_counts, peak_starts,
+                 peak_ends):
+        self.locations = list(locations)
+        self.dated = dated
+        self.occupancy = occupancy
+        self.location_counts = location_counts
+        self.peak_counts = peak_counts
+        self.peak_starts = peak_starts
+        self.peak_ends = peak_ends
+    
+    @classmethod
+    def compute(cls, data, grid, parallel=None):
+        """Compute the snapshot of a ReservationSet on a grid"""
+        data = in_range_reservations(data, grid)
+        locations = sorted(data.present_locations())
+        codes = np.array([data.locations.index(location) for location in locations], dtype=np.int64)
+        
+        starts, ends, rows, _ = grid.clip(*grid.windows(data))
+        if parallel is not None and parallel.enabled:
+            peaks = parallel.peak_arrays(starts, ends, data.codes[rows], len(data.locations))
+        else:
+            peaks = peak_arrays(starts, ends, data.codes[rows], len(data.locations))
+        return cls(locations, data.dated,
+                   location_occupancy_rows(data, locations, grid, parallel),
+                   data.location_counts()[codes].astype(np.int64),
+                   *(array[codes] for array in peaks))
+    
+    def rows(self, locations):
+        """Occupancy rows of the given locations, in that order"""
+        row_of = {location: row for row, location in enumerate(self.locations)}
+        return self.occupancy[[row_of[location] for location in locations]]
+    
+    def peaks(self):
+        """{location: {'count', 'start', 'end'}} as calculate_peak_overlaps, without reservations"""
+        return {location: {'count': int(self.peak_counts[row]),
+                           'start': int(self.peak_starts[row]) if self.peak_counts[row] else None,
+                           'end': int(self.peak_ends[row]) if self.peak_counts[row] else None}
+                for row, location in enumerate(self.locations)}
+    
+    def save(self, path, source_hash, grid):
+        """Write the snapshot; every file is replaced whole, so open memory maps stay valid"""
+        os.makedirs(path, exist_ok=True)
+        # Metadata goes first and comes back last, so a half-written snapshot never loads
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        for name in SNAPSHOT_ARRAYS:
+            temporary = os.path.join(path, f".{name}.npy.tmp")
+            with open(temporary, 'wb') as target:
+                np.save(target, np.ascontiguousarray(getattr(self, name)))
+            os.replace(temporary, os.path.join(path, f"{name}.npy"))
+        
+        temporary = os.path.join(path, ".meta.json.tmp")
+        with open(temporary, 'w') as target:
+            json.dump({'version': SNAPSHOT_VERSION, 'source': source_hash, 'grid': repr(grid.key),
+                       'locations': self.locations, 'dated': self.dated}, target)
+        os.replace(temporary, meta_path)
+    
+    @classmethod
+    def load(cls, path, source_hash, grid):
+        """Memory-map a saved snapshot, or None if missing or stale"""
+        try:
+            with open(os.path.join(path, "meta.json")) as source:
+                meta = json.load(source)
+            if (meta.get('version') != SNAPSHOT_VERSION or meta.get('source') != source_hash
+                    or meta.get('grid') != repr(grid.key)):
+                return None
+            arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+                      for name in SNAPSHOT_ARRAYS]
+        except (OSError, ValueError):
+            return None
+        return cls(meta['locations'], meta['dated'], *arrays)
+
+def load_or_compute_snapshot(source_path, grid, load_data, parallel=None):
+    """The snapshot saved next to source_path if it still matches, else a freshly saved one
+    
+    load_data() returns the source's ReservationSet and is only called
+    when the snapshot has to be recomputed.
+    """
+    source_hash = file_content_hash(source_path)
+    path = snapshot_path(source_path)
+    snapshot = OccupancySnapshot.load(path, source_hash, grid)
+    if snapshot is None:
+        snapshot = OccupancySnapshot.compute(load_data(), grid, parallel)
+        try:
+            snapshot.save(path, source_hash, grid)
+        except OSError:
+            pass  # read-only location: use the snapshot without persisting it
+    return snapshot
+
+# Shared dataset registry
+DATASET_REGISTRY_BYTES = 1 << 30
+
+def bytes_content_hash(content):
+    """Digest of in-memory bytes, equal to file_content_hash of a file holding them"""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+def _array_attributes(value):
+    """NumPy arrays held by a value, directly or as instance attributes"""
+    if isinstance(value, np.ndarray):
+        return [value]
+    if isinstance(value, (tuple, list)):
+        return [array for item in value for array in _array_attributes(item)]
+    if hasattr(value, '__dict__'):
+        return [array for item in vars(value).values() for array in _array_attributes(item)]
+    return []
+
+class DatasetRegistry:
+    """Process-wide store of parsed datasets and derived values, keyed by content hash
+    
+    Sessions that load the same bytes share one ReservationSet, and one copy
+    of each value derived from it (named by a hashable such as a grid key).
+    Stored arrays are made read-only since every session sees them. Entries
+    are evicted least recently used first once their arrays exceed
+    max_bytes in total; the entry just returned is kept even if it alone
+    is larger. Concurrent requests for a missing entry compute it once.
+    """
+    
+    def __init__(self, max_bytes=DATASET_REGISTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _lookup(self, item):
+        """Stored value of (key, name), marked as just used, or None (call under the lock)"""
+        if item not in self._entries:
+            return None
+        self._entries.move_to_end(item)
+        return self._entries[item][0]
+    
+    def get(self, key, name, compute):
+        """Value stored as (key, name), calling compute() to create it if missing"""
+        item = (key, name)
+        with self._lock:
+            value = self._lookup(item)
+            if value is not None:
+                return value
+            loading = self._loading.setdefault(item, threading.Lock())
+        
+        with loading:
+            with self._lock:
+                value = self._lookup(item)
+            if value is not None:
+                return value
+            try:
+                value = compute()
+                arrays = _array_attributes(value)
+                for array in arrays:
+                    array.setflags(write=False)
+                size = sum(array.nbytes for array in arrays)
+                with self._lock:
+                    self._entries[item] = (value, size)
+                    self.nbytes += size
+                    self._evict(item)
+            finally:
+                with self._lock:
+                    self._loading.pop(item, None)
+        return value
+    
+    def dataset(self, key, load):
+        """Shared ReservationSet for content hash key, calling load() to parse it if missing"""
+        return self.get(key, 'dataset', load)
+    
+    def _evict(self, keep):
+        """Drop least recently used entries other than keep until within max_bytes"""
+        for item in list(self._entries):
+            if self.nbytes <= self.max_bytes:
+                break
+            if item != keep:
+                self.nbytes -= self._entries.pop(item)[1]
+
+# Background computation
+BACKGROUND_WORKERS = 2
+
+class BackgroundJob:
+    """Named stages run in order on an executor thread, for one view of the data
+    
+    Stages are zero-argument callables run for their side effect, typically
+    filling a cache that the caller reads once the stage is ready; the job
+    only records which stages finished and the exception of any that
+    failed. cancel() skips the stages that have not started (a running
+    stage cannot be interrupted and finishes first), so a job whose key no
+    longer matches the view is cancelled and replaced.
+    """
+    
+    def __init__(self, key, stages):
+        self.key = key
+        self.current = None
+        self._stages = list(stages)
+        self._finished = set()
+        self._errors = {}
+        self._cancelled = threading.Event()
+        self._future = None
+    
+    def start(self, executor):
+        """Submit the stages to an executor; returns the job"""
+        self._future = executor.submit(self._run)
+        return self
+    
+    def _run(self):
+        for name, compute in self._stages:
+            if self._cancelled.is_set():
+                break
+            self.current = name
+            try:
+                compute()
+            except Exception as e:
+                self._errors[name] = e
+            self._finished.add(name)
+        self.current = None
+    
+    def cancel(self):
+        """Skip the stages that have not started yet"""
+        self._cancelled.set()
+    
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+    
+    @property
+    def done(self):
+        return self._future is not None and self._future.done()
+    
+    @property
+    def progress(self):
+        """Fraction of stages finished"""
+        return len(self._finished) / len(self._stages) if self._stages else 1.0
+    
+    def ready(self, *names):
+        """Whether every named stage has finished, successfully or not"""
+        return all(name in self._finished for name in names)
+    
+    def error(self, name):
+        """Exception raised by a finished stage, or None"""
+        return self._errors.get(name)
+    
+    def wait(self, timeout=None):
+        """Block until the job is done or timeout seconds have passed"""
+        if self._future is not None:
+            wait([self._future], timeout)
+
+# Command-line reports
+def in_range_reservations(data, grid):
+    """Reservations whose occupancy window overlaps the grid"""
+    data = data.between(grid.start_minute - grid.max_buffer + 1, grid.end_minute + grid.max_buffer)
+    return data.take(grid.overlaps(*grid.windows(data)))
+
+def location_peak_frame(data, grid, parallel=None, snapshot=None):
+    """Per-location reservation count and peak overlap with its first interval
+    
+    A snapshot of the same data and grid is read instead of computing one.
+    """
+    if snapshot is None:
+        snapshot = OccupancySnapshot.compute(data, grid, parallel)
+    peaks = snapshot.peaks()
+    locations = snapshot.locations
+    return pd.DataFrame({
+        'Location': locations,
+        'Reservations': np.asarray(snapshot.location_counts),
+        'Peak Overlap': [peaks[location]['count'] for location in locations],
+        'Peak Start': [format_minutes(peaks[location]['start'], snapshot.dated)
+                       if peaks[location]['start'] is not None else None for location in locations],
+        'Peak End': [format_minutes(peaks[location]['end'], snapshot.dated)
+                     if peaks[location]['end'] is not None else None for location in locations]
+    })
+
+def location_occupancy_frame(data, grid, parallel=None, snapshot=None):
+    """Slot occupancy counts with one row per location and one column per slot"""
+    if snapshot is None:
+        snapshot = OccupancySnapshot.compute(data, grid, parallel)
+    columns = [grid.slot_label(minute) for minute in grid.slot_starts().tolist()]
+    return pd.DataFrame(np.asarray(snapshot.occupancy),
+                        index=pd.Index(snapshot.locations, name='Location'), columns=columns)
+
+def location_conflict_frame(data, grid, capacity=DEFAULT_CAPACITY, location_capacities=None):
+    """Every over-capacity interval with the IDs of the reservations involved"""
+    return detect_conflicts(in_range_reservations(data, grid), grid, capacity,
+                            location_capacities).frame()
+
+def write_frame(frame, path, index=False):
+    """Write a report as CSV, JSON or Parquet depending on the file extension"""
+    extension = path.rsplit('.', 1)[-1].lower() if '.' in path else 'csv'
+    if extension == 'json':
+        frame.to_json(path, orient='table', index=index)
+    elif extension in ('parquet', 'pq'):
+        frame.to_parquet(path, index=index)
+    else:
+        frame.to_csv(path, index=index)
+
+def _location_buffer(value):
+    location, _, minutes = value.rpartition('=')
+    if not location or not minutes.isdigit() or int(minutes) < 1:
+        raise argparse.ArgumentTypeError(f"expected LOCATION=MINUTES, got {value!r}")
+    return location, int(minutes)
+
+def _location_capacity(value):
+    location, _, capacity = value.rpartition('=')
+    if not location or not capacity.isdigit():
+        raise argparse.ArgumentTypeError(f"expected LOCATION=CAPACITY, got {value!r}")
+    return location, int(capacity)
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {value!r}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Per-location occupancy and peak overlap of a reservation file")
+    parser.add_argument('file', help="CSV, Parquet or Arrow file with location, id and time "
+                                     "columns ('-' reads CSV from stdin), or a SQLite database")
+    parser.add_argument('--format', choices=sorted(set(FILE_FORMATS.values())),
+                        help="file format (default: from the file extension)")
+    parser.add_argument('--start-hour', type=int, default=8)
+    parser.add_argument('--end-hour', type=int, default=18)
+    parser.add_argument('--slot-minutes', type=int, default=DEFAULT_SLOT_MINUTES)
+    parser.add_argument('--buffer', type=int, default=DEFAULT_BUFFER_MINUTES,
+                        help="occupancy buffer (±minutes) around each reservation")
+    parser.add_argument('--location-buffer', type=_location_buffer, action='append', default=[],
+                        metavar='LOCATION=MINUTES', help="per-location buffer override")
+    parser.add_argument('--start-date', type=_date, help="first day of dated data (default: first day)")
+    parser.add_argument('--end-date', type=_date, help="last day of dated data (default: last day)")
+    parser.add_argument('--location', help="only report this location")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="split per-location work across this many workers")
+    parser.add_argument('--executor', choices=PARALLEL_EXECUTORS, default='thread')
+    report = parser.add_mutually_exclusive_group()
+    report.add_argument('--occupancy', action='store_true',
+                        help="report slot occupancy per location instead of peaks")
+    report.add_argument('--conflicts', action='store_true',
+                        help="report every interval where a location exceeds its capacity")
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY,
+                        help="concurrent reservations a location allows (default: %(default)s)")
+    parser.add_argument('--location-capacity', type=_location_capacity, action='append', default=[],
+                        metavar='LOCATION=CAPACITY', help="per-location capacity override")
+    parser.add_argument('--output', help="write the report to a .csv, .json or .parquet file "
+                                         "instead of printing it")
+    parser.add_argument('--snapshot', action='store_true',
+                        help="reuse occupancy and peaks saved next to the file, saving them "
+                             "when missing or stale")
+    parser.add_argument('--save-db', metavar='DATABASE',
+                        help="also store the file's reservations in this SQLite database, "
+                             "replacing its contents")
+    args = parser.parse_args(argv)
+    if not 0 <= args.start_hour < args.end_hour <= 24:
+        parser.error("hours must satisfy 0 <= start hour < end hour <= 24")
+    if args.workers < 1:
+        parser.error("workers must be at least 1")
+    if args.slot_minutes < 1 or args.buffer < 1:
+        parser.error("slot width and buffer must be at least one minute")
+    if args.capacity < 0:
+        parser.error("capacity must not be negative")
+    if args.snapshot and args.file == '-':
+        parser.error("--snapshot needs a file, not stdin")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    database = None
+    try:
+        if is_database_file(args.file):
+            database = ReservationDatabase(args.file, create=False)
+        elif args.file == '-':
+            data = read_reservations(sys.stdin, args.format or 'csv')
+        else:
+            data = read_reservations(args.file, args.format or file_format_from_name(args.file))
+        if args.save_db and database is None:
+            ReservationDatabase(args.save_db).add(data, replace=True)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if database is None and len(data.rejected):
+        print(f"warning: {data.rejected.summary()}, first at row {data.rejected.rows[0]}",
+              file=sys.stderr)
+    
+    # Dated data defaults to every day it covers
+    if database is not None:
+        dated, day_range = database.dated, database.day_range()
+    else:
+        all_data = data
+        if args.location is not None:
+            data = data.filter_location(args.location)
+        days = data.days()
+        dated, day_range = data.dated, (int(days[0]), int(days[-1])) if len(days) else None
+    start_day = end_day = 0
+    if dated and day_range is not None:
+        start_day = date_to_day(args.start_date) if args.start_date else day_range[0]
+        end_day = date_to_day(args.end_date) if args.end_date else day_range[1]
+    grid = TimeGrid(args.start_hour, args.end_hour, args.slot_minutes, args.buffer,
+                    dict(args.location_buffer), start_day, max(start_day, end_day))
+    
+    # Databases only load the rows of the selected days and location
+    if database is not None:
+        data = database.load_view(grid, args.location)
+    
+    parallel = ParallelConfig(args.workers, args.executor)
+    
+    # Snapshots cover every location; the location filter then picks rows
+    snapshot = None
+    if args.snapshot and not args.conflicts:
+        if database is not None:
+            load_data = lambda: database.load_view(grid)
+        else:
+            load_data = lambda: all_data
+        snapshot = load_or_compute_snapshot(args.file, grid, load_data, parallel)
+    
+    if args.occupancy:
+        frame, index = location_occupancy_frame(data, grid, parallel, snapshot), True
+        if snapshot is not None and args.location is not None:
+            frame = frame[frame.index == args.location]
+    elif args.conflicts:
+        frame, index = location_conflict_frame(data, grid, args.capacity,
+                                               dict(args.location_capacity)), False
+    else:
+        frame, index = location_peak_frame(data, grid, parallel, snapshot), False
+        if snapshot is not None and args.location is not None:
+            frame = frame[frame['Location'] == args.location]
+    
+    if args.output:
+        write_frame(frame, args.output, index)
+    else:
+        frame.to_csv(sys.stdout, index=index)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
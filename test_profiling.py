@@ -0,0 +1,23 @@
+import tracemalloc
+
+from profiling import StageProfiler
+
+def test_allocation_tracing_is_shared_between_profilers():
+    first = StageProfiler(True, True)
+    second = StageProfiler(True, True)
+    first.finish()
+    assert tracemalloc.is_tracing()
+    with second.stage("after the other rerun finished") as record:
+        bytearray(1 << 20)
+    assert record.peak_bytes >= 1 << 20
+    second.finish()
+    second.finish()
+    assert not tracemalloc.is_tracing()
+
+def test_tracing_started_elsewhere_is_left_running():
+    tracemalloc.start()
+    try:
+        StageProfiler(True, True).finish()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
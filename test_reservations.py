@@ -0,0 +1,271 @@
+import io
+import random
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reservations import (INVALID_ID, INVALID_TIME, MISSING_DATE, MISSING_ID, MISSING_LOCATION,
+                          LOCATION_SET_CONDITIONS, AvailabilityIndex, DatasetRegistry,
+                          LiveReservationStore, OccupancyBitsets, ReservationDatabase,
+                          ReservationSet, TimeGrid, calculate_peak_overlaps, calculate_time_slots,
+                          detect_conflicts, parse_pasted_reservations, parse_time_column,
+                          read_reservations)
+
+def test_numeric_times_are_rejected():
+    minutes, dated, errors = parse_time_column([600, 615, 1200])
+    assert not dated
+    assert list(errors) == [INVALID_TIME] * 3
+
+def test_numeric_time_column_rows_are_reported():
+    pytest.importorskip('pyarrow')
+    frame = pd.DataFrame({'location': ['A', 'A', 'B'], 'id': [1, 2, 3], 'time': [600, 615, 1200]})
+    source = io.BytesIO()
+    frame.to_parquet(source)
+    source.seek(0)
+    data = read_reservations(source, 'parquet')
+    assert len(data) == 0
+    assert list(data.rejected.rows) == [1, 2, 3]
+
+def test_am_pm_clock_times_stay_undated():
+    minutes, dated, errors = parse_time_column(['10:00 AM', '12:30 am', '1:05 PM', '08:00', '13:00 PM'])
+    assert not dated
+    assert list(minutes[:4]) == [600, 30, 785, 480]
+    assert list(errors) == [0, 0, 0, 0, INVALID_TIME]
+
+def test_date_times_keep_their_date():
+    minutes, dated, errors = parse_time_column(['2024-01-02 10:00', '08:00'])
+    assert dated
+    assert list(errors) == [0, MISSING_DATE]
+    assert minutes[0] % (24 * 60) == 600
+
+def test_clock_times_next_to_date_times_are_missing_a_date():
+    data = read_reservations(io.StringIO("location,id,time\nA,1,2024-01-02 10:00\nB,2,10:00\n"))
+    assert data.dated
+    assert [int(day) for day in data.days()] == [19724]
+    assert list(data.rejected.rows) == [2]
+    assert list(data.rejected.errors) == [MISSING_DATE]
+
+def test_undated_chunks_before_a_dated_chunk_are_missing_a_date():
+    text = "location,id,time\nB,1,09:30\nB,2,10:00\nA,3,2024-01-02 10:00\nC,4,11:00\n"
+    data = read_reservations(io.StringIO(text), chunk_rows=2)
+    assert list(data.ids) == [3]
+    assert list(data.rejected.rows) == [1, 2, 4]
+    assert list(data.rejected.errors) == [MISSING_DATE] * 3
+    assert list(data.rejected.values) == ['09:30', '10:00', '11:00']
+
+@pytest.mark.parametrize('others', [[], ['2024-01-02 10:00+02:00', '2024-01-02 10:00']])
+def test_offset_times_convert_to_utc_whatever_they_are_parsed_with(others):
+    minutes, dated, errors = parse_time_column(['2024-01-02 10:00+09:00'] + others)
+    assert list(errors) == [0] * (1 + len(others))
+    assert minutes[0] % (24 * 60) == 60
+    assert list(minutes[1:] % (24 * 60)) == [480, 600][:len(others)]
+
+def _peak_count(records, start_hour, end_hour, buffer_minutes):
+    data = ReservationSet.from_records(records)
+    first_day, last_day = (int(day) for day in data.days())
+    grid = TimeGrid(start_hour, end_hour, 10, buffer_minutes, start_day=first_day, end_day=last_day)
+    return calculate_peak_overlaps(data, grid)['A']['count'], len(detect_conflicts(data, grid, 1))
+
+def test_windows_crossing_midnight_count_on_the_next_day():
+    records = [{'location': 'A', 'id': 1, 'time': '2024-01-01 23:55'},
+               {'location': 'A', 'id': 2, 'time': '2024-01-02 00:30'}]
+    assert _peak_count(records, 0, 24, 30) == (2, 1)
+
+def test_long_buffers_reach_the_next_daily_window():
+    records = [{'location': 'A', 'id': 1, 'time': '2024-01-01 23:00'},
+               {'location': 'A', 'id': 2, 'time': '2024-01-02 08:30'}]
+    assert _peak_count(records, 8, 18, 600) == (2, 1)
+
+def test_pasted_rows_naming_a_location_are_not_a_header():
+    data = parse_pasted_reservations("Location 1,5,10:00\nLocation 2,6,11:00")
+    assert data.locations == ['Location 1', 'Location 2']
+    data = parse_pasted_reservations("Location, ID, Time\nLocation 1,5,10:00")
+    assert len(data) == 1
+
+def test_rows_with_bad_ids_or_locations_are_reported():
+    data = read_reservations(io.StringIO("location,id,time\nA,1,10:00\nA,,10:00\nA,x1,10:00\n"
+                                         ",4,10:00\nB,5,11:00\n"))
+    assert sorted(data.present_locations()) == ['A', 'B']
+    assert list(data.ids) == [1, 5]
+    assert list(data.rejected.rows) == [2, 3, 4]
+    assert list(data.rejected.errors) == [MISSING_ID, INVALID_ID, MISSING_LOCATION]
+
+def test_large_ids_stay_exact_next_to_a_blank_id():
+    data = read_reservations(io.StringIO("location,id,time\nA,123456789012345678,10:00\n"
+                                         "A,,10:00\nB,9007199254740993,11:00\n"))
+    assert list(data.ids) == [123456789012345678, 9007199254740993]
+    assert list(data.rejected.errors) == [MISSING_ID]
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_arrow_files_and_streams_read_from_a_path(tmp_path, stream):
+    pa = pytest.importorskip('pyarrow')
+    table = pa.table({'location': ['A', 'B'], 'id': [1, 2], 'time': ['10:00', '11:00']})
+    path = tmp_path / ('data.arrows' if stream else 'data.arrow')
+    with pa.OSFile(str(path), 'wb') as sink:
+        writer = (pa.ipc.new_stream if stream else pa.ipc.new_file)(sink, table.schema)
+        writer.write_table(table)
+        writer.close()
+    data = read_reservations(str(path), 'arrow')
+    assert list(data.ids) == [1, 2]
+
+def test_reading_a_database_never_writes_to_it(tmp_path):
+    path = str(tmp_path / 'other.db')
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE things (x)")
+    with pytest.raises(ValueError):
+        ReservationDatabase(path, create=False)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT name FROM sqlite_master").fetchall() == [('things',)]
+    
+    path = str(tmp_path / 'reservations.db')
+    records = [{'location': 'A', 'id': 1, 'time': '10:00'}]
+    ReservationDatabase(path).add(ReservationSet.from_records(records))
+    database = ReservationDatabase(path, create=False)
+    assert database.location_counts() == {'A': 1}
+    with pytest.raises(sqlite3.OperationalError):
+        database.add(ReservationSet.from_records([{'location': 'B', 'id': 2, 'time': '11:00'}]))
+
+def test_store_metrics_match_batch_results_after_random_edits():
+    rng = random.Random(11)
+    grid = TimeGrid(8, 12, 10, 30, {'B': 5})
+    store = LiveReservationStore({})
+    store.add_set(ReservationSet.from_records([{'location': 'A', 'id': 0, 'time': '09:00'}]))
+    store.sync(grid)
+    ids = [0]
+    for step in range(1, 400):
+        if rng.random() < 0.35 and ids:
+            assert store.remove(ids.pop(rng.randrange(len(ids))))
+        else:
+            assert store.add(rng.choice('ABC'), step, rng.randrange(7 * 60, 13 * 60))
+            ids.append(step)
+        if step % 20 and step < 380:
+            continue
+        data = store.reservation_set()
+        peaks = calculate_peak_overlaps(data, grid)
+        for location in 'ABC':
+            peak = peaks.get(location, {'count': 0})
+            assert store.peak(location) == peak['count']
+            if peak['count']:
+                assert store.peak_interval(location) == (peak['start'], peak['end'])
+            assert store.total(location) == len(calculate_time_slots(data, grid, location)[1])
+        assert store.peak() == max((peak['count'] for peak in peaks.values()), default=0)
+
+def _random_records(seed, count, locations='AB', days='12'):
+    rng = random.Random(seed)
+    return [{'location': rng.choice(locations), 'id': i,
+             'time': f"2024-01-0{rng.choice(days)} {rng.randrange(24):02d}:{rng.randrange(60):02d}"}
+            for i in range(count)]
+
+def _minute_conflicts(data, grid, capacities):
+    """Conflicts of detect_conflicts, found by counting every grid minute"""
+    minutes = TimeGrid(grid.start_hour, grid.end_hour, 1, grid.buffer_minutes, grid.location_buffers,
+                       grid.start_day, grid.end_day).slot_starts().tolist()
+    starts, ends = grid.windows(data)
+    conflicts = []
+    for code, location in enumerate(data.locations):
+        mine = data.codes == code
+        run = None
+        for minute in minutes + [None]:
+            count = 0 if minute is None else int((mine & (starts <= minute) & (ends > minute)).sum())
+            if run and (count <= capacities[location] or minute != run[2]):
+                conflicts.append(run)
+                run = None
+            if count > capacities[location]:
+                start, peak = (run[1], max(count, run[3])) if run else (minute, count)
+                run = [code, start, minute + 1, peak]
+    conflicts.sort(key=lambda conflict: (conflict[1], conflict[0]))
+    return [(code, start, end, peak,
+             sorted(data.ids[(data.codes == code) & (starts < end) & (ends > start)]))
+            for code, start, end, peak in conflicts]
+
+@pytest.mark.parametrize('hours', [(0, 24), (6, 20)])
+def test_conflicts_match_a_per_minute_scan(hours):
+    for seed in range(8):
+        data = ReservationSet.from_records(_random_records(seed, 60))
+        first_day, last_day = (int(day) for day in data.days()[[0, -1]])
+        grid = TimeGrid(*hours, 10, 45, {'B': 20}, start_day=first_day, end_day=last_day)
+        report = detect_conflicts(data, grid, 2, {'B': 1})
+        found = [(report.codes[i], report.starts[i], report.ends[i], report.peaks[i],
+                  sorted(report.reservations(i).ids)) for i in range(len(report))]
+        assert found == _minute_conflicts(data, grid, {'A': 2, 'B': 1})
+
+def _minute_counts(data, grid, location, minutes):
+    """Windows of location covering each minute"""
+    starts, ends = grid.windows(data)
+    mine = data.codes == (data.locations.index(location) if location in data.locations else -1)
+    return ((starts[mine, None] <= minutes) & (ends[mine, None] > minutes)).sum(axis=0)
+
+@pytest.mark.parametrize('location, duration, capacity, later',
+                         [('A', 0, 1, 0), ('B', 30, 2, 0), ('A', 90, 1, 400), ('C', 15, 1, 0)])
+def test_free_windows_match_a_per_minute_scan(location, duration, capacity, later):
+    for seed in range(6):
+        data = ReservationSet.from_records(_random_records(seed, 40))
+        first_day, last_day = (int(day) for day in data.days()[[0, -1]])
+        grid = TimeGrid(6, 20, 10, 45, {'B': 20}, start_day=first_day, end_day=last_day)
+        window_starts, window_ends = grid.daily_windows()
+        earliest = int(window_starts[0]) + later
+        buffer = grid.location_buffers.get(location, grid.buffer_minutes)
+        minutes = np.arange(grid.start_minute - buffer, grid.end_minute + buffer)
+        counts = _minute_counts(data, grid, location, minutes)
+        
+        runs = []
+        for start, end in zip(window_starts.tolist(), window_ends.tolist()):
+            for minute in range(max(start, earliest), end):
+                lo = minute - buffer - int(minutes[0])
+                if minute + duration <= end and counts[lo:lo + duration + 2 * buffer].max() < capacity:
+                    if runs and runs[-1][1] == minute - 1:
+                        runs[-1][1] = minute
+                    else:
+                        runs.append([minute, minute])
+        found = AvailabilityIndex(data, grid).find(location, duration, capacity, earliest, n=5)
+        assert found == [tuple(run) for run in runs[:5]]
+
+def test_location_set_bitsets_match_per_minute_occupancy():
+    data = ReservationSet.from_records(_random_records(20, 50, 'ABC', '123'))
+    first_day, last_day = (int(day) for day in data.days()[[0, -1]])
+    # Three 13-hour days are not a whole number of bytes, so negations must clear the padding
+    grid = TimeGrid(6, 19, 10, 30, {'B': 10}, start_day=first_day, end_day=last_day)
+    bitsets = OccupancyBitsets(data, grid)
+    busy = {location: _minute_counts(data, grid, location, bitsets.minutes) > 0
+            for location in ['A', 'B', 'C', 'D']}
+    assert list(bitsets.busy_minutes()) == [busy[location].sum() for location in data.locations]
+    
+    expected = {'all busy': np.logical_and.reduce, 'any busy': np.logical_or.reduce,
+                'all free': lambda rows: ~np.logical_or.reduce(rows),
+                'any free': lambda rows: ~np.logical_and.reduce(rows)}
+    for locations in (['A'], ['A', 'B'], ['A', 'B', 'C'], ['B', 'D']):
+        for condition in LOCATION_SET_CONDITIONS:
+            packed = bitsets.combine(locations, condition)
+            minutes = expected[condition]([busy[location] for location in locations])
+            assert bitsets.popcount(packed) == minutes.sum()
+            assert (np.unpackbits(packed, count=len(bitsets.minutes)).astype(bool) == minutes).all()
+
+def test_registry_evicts_least_recently_used_within_its_byte_budget():
+    rng = random.Random(24)
+    registry = DatasetRegistry(max_bytes=100)
+    sizes = {key: rng.choice([8, 16, 30, 40, 150]) for key in range(12)}
+    expected = {}
+    for _ in range(300):
+        key = rng.randrange(12)
+        computed = []
+        
+        def compute():
+            computed.append(key)
+            half = sizes[key] // 2
+            return np.zeros(half, dtype=np.uint8), [np.zeros(sizes[key] - half, dtype=np.uint8)]
+        
+        value = registry.get(key, 'value', compute)
+        assert computed == ([] if key in expected else [key])
+        assert not value[0].flags.writeable
+        
+        # Model: move to most recent, then drop the oldest others until within budget
+        expected[key] = expected.pop(key, sizes[key])
+        for other in list(expected):
+            if sum(expected.values()) <= registry.max_bytes:
+                break
+            if other != key:
+                del expected[other]
+        assert len(registry) == len(expected)
+        assert registry.nbytes == sum(expected.values())